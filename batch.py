@@ -0,0 +1,256 @@
+""" Vectorized lockstep simulator that plays many games at once.
+    All games are kept in structure-of-arrays form (one numpy array per stat) and every call to
+    step() moves each game that is still running forward by exactly one move.
+    The rules are the ones of BattleManager.fight, BattleManager.run, BattleManager.reward_player
+    and the room transitions of GameController.execute_move / update_game_state.
+"""
+import numpy as np
+
+from dungeon import Dungeon
+from dungeon.rng import RandomStream
+from stats import GameStats
+
+
+class BatchSimulator:
+    """ Simulates n games of the same dungeon layout in lockstep
+        Policies:
+            'first'  -- fight every monster and always take the first door
+            'run'    -- run from every monster and always take the first door
+            'random' -- fight or run with equal odds and take a random door
+    """
+    # room types, as stored in room_type
+    ENTRY = 0
+    EXIT = 1
+    MONSTER = 2
+    TREASURE = 3
+
+    POLICIES = ('first', 'run', 'random')
+
+    def __init__(self, n, policy='first', seed=None, rooms=None, links=None):
+        if policy not in BatchSimulator.POLICIES:
+            raise ValueError(f'unknown policy {policy}, expected one of {BatchSimulator.POLICIES}')
+
+        self.n = n
+        self.policy = policy
+        # seed can also be a RandomStream, only its generator is used for the vectorized draws
+        stream = seed if isinstance(seed, RandomStream) else RandomStream(seed)
+        self.rng = stream.generator
+        self._load_layout(Dungeon.init_rooms if rooms is None else rooms,
+                          Dungeon.room_links if links is None else links)
+        self.reset()
+
+    def _load_layout(self, rooms, links):
+        """ Converts the dungeon layout (same format as Dungeon.init_rooms and Dungeon.room_links)
+            to arrays of room indexes. Connections keep the order of the links, like Dungeon.next_rooms
+        """
+        self.room_ids = np.array(list(rooms.keys()))
+        index = {room_id: i for i, room_id in enumerate(rooms.keys())}
+
+        kinds = []
+        for v in rooms.values():
+            kind = v if isinstance(v, str) else v[0]
+            kinds.append(kind)
+        kinds = np.array(kinds)
+        self.murky = kinds == 'MURKY'
+        self.entry = int(np.nonzero(kinds == 'ENTRY')[0][0])
+        self.base_type = np.where(kinds == 'EXIT', BatchSimulator.EXIT, BatchSimulator.ENTRY).astype(np.int8)
+
+        connections = [[] for _ in rooms]
+        for src, dst in links:
+            if src in index and dst in index and src != dst:
+                connections[index[src]].append(index[dst])
+
+        self.degree = np.array([len(c) for c in connections], dtype=np.int32)
+        self.next_room = np.full((len(rooms), max(1, self.degree.max())), -1, dtype=np.int32)
+        for i, c in enumerate(connections):
+            self.next_room[i, :len(c)] = c
+
+    def reset(self):
+        """ Rolls a new dungeon and a new player for every game """
+        n, r, rng = self.n, len(self.room_ids), self.rng
+
+        # player, agility is rolled before health as in Creature.__init__
+        self.agility = rng.integers(2, 11, size=n).astype(np.int8)
+        self.health = rng.integers(2, 11, size=n).astype(np.int8)
+        self.is_alive = np.ones(n, dtype=bool)
+        self.escaped = np.zeros(n, dtype=bool)
+        self.stuck = np.zeros(n, dtype=bool)                 # in a dead end: the game is over, not escaped
+        self.fights_count = np.zeros(n, dtype=np.int32)
+        self.runs_count = np.zeros(n, dtype=np.int32)
+        self.moves = np.zeros(n, dtype=np.int32)
+        self.location = np.full(n, -1, dtype=np.int32)      # room index, -1 until the dungeon is entered
+
+        # rooms: murky rooms hold a monster 75% of the time, a treasure otherwise
+        is_monster = (rng.random((n, r)) < 0.75) & self.murky
+        is_treasure = ~is_monster & self.murky
+        self.room_type = np.where(is_monster, BatchSimulator.MONSTER,
+                                  np.where(is_treasure, BatchSimulator.TREASURE, self.base_type)).astype(np.int8)
+        self.has_monster = is_monster
+        self.has_treasure = is_treasure
+        self.monster_agility = np.where(is_monster, rng.integers(2, 11, size=(n, r)), 0).astype(np.int8)
+        self.monster_health = np.where(is_monster, rng.integers(2, 11, size=(n, r)), 0).astype(np.int8)
+        self.agility_reward = np.where(is_treasure, rng.integers(2, 9, size=(n, r)), 0).astype(np.int8)
+        self.health_reward = np.where(is_treasure, rng.integers(2, 9, size=(n, r)), 0).astype(np.int8)
+
+    @property
+    def running(self):
+        """ Mask of the games that have not ended yet """
+        return self.is_alive & ~self.escaped & ~self.stuck
+
+    def step(self):
+        """ Moves every running game forward by one move
+            Returns the number of games that were still running before the step
+        """
+        g = np.nonzero(self.running)[0]
+        if len(g) == 0:
+            return 0
+        self.moves[g] += 1
+
+        loc = self.location[g]
+        outside = loc < 0
+        loc = np.where(outside, self.entry, loc)
+        room_type = self.room_type[g, loc]
+        has_monster = self.has_monster[g, loc] & ~outside
+        has_treasure = self.has_treasure[g, loc] & ~outside
+        at_exit = (room_type == BatchSimulator.EXIT) & ~outside
+
+        # enter the dungeon
+        self.location[g[outside]] = self.entry
+
+        # escape through the exit
+        self.escaped[g[at_exit]] = True
+
+        # fight or run
+        if self.policy == 'first':
+            fight = has_monster
+        elif self.policy == 'run':
+            fight = np.zeros_like(has_monster)
+        else:
+            fight = has_monster & (self.rng.random(len(g)) < 0.5)
+        self._fight(g[fight], loc[fight])
+        run = has_monster & ~fight
+        self._run(g[run], loc[run])
+
+        # pick up the reward
+        self._reward(g[has_treasure], loc[has_treasure])
+
+        # otherwise move to one of the next rooms
+        move = ~(outside | at_exit | has_monster | has_treasure)
+        self._move(g[move], loc[move])
+
+        return len(g)
+
+    def _fight(self, g, loc):
+        """ Same odds and damage as BattleManager.fight and the PLAYER_WON state update """
+        if len(g) == 0:
+            return
+        ph = self.health[g]
+        mh = self.monster_health[g, loc]
+        player_won = self.rng.random(len(g)) < ph / (ph + mh)
+        self.fights_count[g] += 1
+
+        # monster won, player loses health
+        lost = ~player_won
+        gl = g[lost]
+        self.health[gl] = np.where(ph[lost] > 2, ph[lost] - 2, 0)
+        self.is_alive[gl] = ph[lost] > 2
+
+        # player won, monster loses health and the room is cleared if the monster died
+        gw, lw = g[player_won], loc[player_won]
+        mh = mh[player_won]
+        self.monster_health[gw, lw] = np.where(mh > 2, mh - 2, 0)
+        killed = mh <= 2
+        self.has_monster[gw[killed], lw[killed]] = False
+        self.monster_agility[gw[killed], lw[killed]] = 0
+
+    def _run(self, g, loc):
+        """ Same odds and damage as BattleManager.run, followed by the move to the first next room """
+        if len(g) == 0:
+            return
+        pa = self.agility[g].astype(np.int16)
+        ma = self.monster_agility[g, loc]
+        # as in BattleManager.run, the player is hurt when the draw lands on the player's odds
+        hurt = self.rng.random(len(g)) < pa / (pa + ma)
+        self.runs_count[g] += 1
+
+        gh = g[hurt]
+        health = self.health[gh] - 2
+        self.agility[gh] = np.maximum(self.agility[gh] - 2, 0)
+        self.health[gh] = np.maximum(health, 0)
+        self.is_alive[gh] = health > 0
+
+        escaped = self.is_alive[g]
+        self._enter_first(g[escaped], loc[escaped])
+
+    def _enter_first(self, g, loc):
+        """ Moves the player to the first connected room, the game ends in a room without any
+            (a dead end, the player never escapes: solver.Solver values it as DEAD)
+        """
+        dead_end = self.degree[loc] == 0
+        self.stuck[g[dead_end]] = True
+        self.location[g[~dead_end]] = self.next_room[loc[~dead_end], 0]
+
+    def _reward(self, g, loc):
+        """ Same as BattleManager.reward_player and the PICK_UP_REWARD state update """
+        if len(g) == 0:
+            return
+        self.health[g] = np.minimum(self.health[g] + self.health_reward[g, loc], 10)
+        self.agility[g] = np.minimum(self.agility[g] + self.agility_reward[g, loc], 10)
+        self.has_treasure[g, loc] = False
+        self.health_reward[g, loc] = 0
+        self.agility_reward[g, loc] = 0
+
+    def _move(self, g, loc):
+        """ Moves the player to the first (or a random) connected room """
+        if len(g) == 0:
+            return
+        if self.policy != 'random':
+            self._enter_first(g, loc)
+            return
+        degree = self.degree[loc]
+        choice = (self.rng.random(len(g)) * degree).astype(np.int32)
+        # rooms without any connection are dead ends, the game ends there
+        dead_end = degree == 0
+        self.stuck[g[dead_end]] = True
+        self.location[g[~dead_end]] = self.next_room[loc[~dead_end], choice[~dead_end]]
+
+    def run(self, max_moves=10000):
+        """ Steps all games until every one of them has ended (or max_moves is reached)
+            Returns the simulator itself so that results can be read from it
+        """
+        for _ in range(max_moves):
+            if self.step() == 0:
+                break
+        return self
+
+    def results(self):
+        """ Per game results, with the same fields as engine.GameResult """
+        return {
+            'escaped': self.escaped,
+            'died': ~self.is_alive,
+            'fights_count': self.fights_count,
+            'runs_count': self.runs_count,
+            'health': self.health,
+            'agility': self.agility,
+            'final_room': np.where(self.location < 0, -1, self.room_ids[np.maximum(self.location, 0)]),
+            'moves': self.moves,
+        }
+
+
+def simulate(games, policy='first', seed=None, chunk=1000000, rooms=None, links=None):
+    """ Simulates any number of games in chunks (to bound memory) and returns totals
+        {'games', 'escaped', 'died', 'fights', 'runs', 'stats'}, stats being the stats.GameStats of the games
+    """
+    rng = RandomStream(seed)
+    totals = {'games': 0, 'escaped': 0, 'died': 0, 'fights': 0, 'runs': 0, 'stats': GameStats()}
+    while totals['games'] < games:
+        n = min(chunk, games - totals['games'])
+        # each chunk draws from its own independent stream
+        sim = BatchSimulator(n, policy, rng.spawn()[0], rooms, links).run()
+        totals['games'] += n
+        totals['escaped'] += int(sim.escaped.sum())
+        totals['died'] += int((~sim.is_alive).sum())
+        totals['fights'] += int(sim.fights_count.sum())
+        totals['runs'] += int(sim.runs_count.sum())
+        totals['stats'].add_batch(sim.results())
+    return totals
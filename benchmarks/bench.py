@@ -0,0 +1,626 @@
+""" Benchmarks of the hot paths of the game.
+    Every benchmark is timed over inputs that grow with --scale and reported in nanoseconds per
+    operation (the median of --repeat runs, and the best one). Every timed run repeats the operations
+    for at least --min-time seconds, so even the operations that take a few dozen nanoseconds are
+    timed in batches of milliseconds. Results are written as JSON and compared with a stored
+    baseline by their medians; a benchmark that got slower than the baseline by more than its
+    threshold (--threshold, or a looser one of its own) in the first run and again in every one of
+    --confirm runs of that benchmark alone is reported as a regression and the exit status is 1.
+
+    Timings only compare on the machine they were measured on: regenerate the baseline on every
+    machine the benchmarks are compared on (--save-baseline), from an otherwise idle machine. On a
+    shared or virtual machine the same run can differ by more than the thresholds, run a regression
+    again with --filter before believing it.
+
+    python benchmarks/bench.py                              run everything, compare with baseline.json
+    python benchmarks/bench.py --filter battle --out r.json
+    python benchmarks/bench.py --save-baseline              store the results as the new baseline
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import numpy as np
+
+from dungeon import Dungeon, GameController, Player, Monster, BattleManager, Display
+from dungeon.assets import AssetRegistry
+from dungeon.layout import LayoutFile, read_edge_list, write_layout
+from dungeon.rng import RandomStream
+from dungeon.routes import RouteIndex
+from dungeon.world import MonsterWorld
+from dungeon.script import ScriptDriver
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+# name -> (function, sizes, threshold); the function takes a size and returns (callable, operations per call)
+BENCHMARKS = {}
+
+# slowdown ratio of the medians reported as a regression
+THRESHOLD = 1.5
+
+# threshold of the operations that take less than a microsecond: the caches and the frequency of the CPU
+# move them the most
+FAST_THRESHOLD = 2.0
+
+
+def benchmark(name, sizes=(1,), threshold=None):
+    """ Registers a benchmark; threshold replaces --threshold for it if it is looser """
+    def register(f):
+        BENCHMARKS[name] = (f, sizes, threshold)
+        return f
+    return register
+
+
+def make_layout(n):
+    """ A layout of n rooms (n >= 3): the ENTRY, n - 2 MURKY rooms and the EXIT,
+        each room linked to the next one and to the one after it
+    """
+    rooms = {0: 'ENTRY'}
+    for i in range(1, n - 1):
+        rooms[i] = ('MURKY', f'Monster{i}')
+    rooms[n - 1] = 'EXIT'
+    links = [(i, i + 1) for i in range(n - 1)] + [(i, i + 2) for i in range(1, n - 2)]
+    return rooms, tuple(links)
+
+
+def new_dungeon(n, seed=0, **kwargs):
+    rng = RandomStream(seed)
+    rooms, links = make_layout(n)
+    return Dungeon(Player('Dangerous Dave', rng), rng, rooms, links, **kwargs)
+
+
+# construction
+
+def _init(n, **kwargs):
+    rooms, links = make_layout(n)
+    rng = RandomStream(0)
+    p = Player('Dangerous Dave', rng)
+    return lambda: Dungeon(p, rng, rooms, links, **kwargs), 1
+
+
+@benchmark('dungeon_init', sizes=(10, 100, 1000, 10000))
+def dungeon_init(n):
+    return _init(n)
+
+
+@benchmark('dungeon_init_bulk', sizes=(10, 100, 1000, 10000))
+def dungeon_init_bulk(n):
+    return _init(n, bulk=True)
+
+
+@benchmark('dungeon_init_compact', sizes=(10, 100, 1000, 10000))
+def dungeon_init_compact(n):
+    return _init(n, compact=True)
+
+
+@benchmark('layout_open', sizes=(1000, 1000000))
+def layout_open(n):
+    """ Opening a layout file of n rooms (the file is mapped, nothing is parsed) """
+    path = _layout_file(n)
+    return lambda: LayoutFile(path), 1
+
+
+@benchmark('dungeon_init_layout', sizes=(10, 100, 1000, 10000))
+def dungeon_init_layout(n):
+    """ A compact dungeon from a layout file, to compare with dungeon_init_compact """
+    path = _layout_file(n)
+    rng = RandomStream(0)
+    p = Player('Dangerous Dave', rng)
+    return lambda: Dungeon(p, rng, compact=True, layout=path), 1
+
+
+@benchmark('edge_list_game', sizes=(10, 100))
+def edge_list_game(n):
+    """ move_cycle through a layout converted from an edge list whose room ids start at 1, not 0
+        (the player must enter at the ENTRY room of the layout, wherever it is)
+    """
+    rooms, links = read_edge_list(f'{i} {i + 1}' for i in range(1, n))
+    path = os.path.join(tempfile.gettempdir(), f'dungeon_bench_edges_{n}.layout')
+    write_layout(path, rooms, links)
+    master = RandomStream(0)
+    streams = master.spawn(20)
+
+    def run():
+        moves = 0
+        for rng in streams:
+            p = Player('Dangerous Dave', rng)
+            dg = Dungeon(p, rng, layout=path)
+            controller = GameController(dg)
+            controller.update_game_state(controller.execute_move('enter'), 'enter')
+            if dg.player_location != 1:
+                raise AssertionError(f'entered room {dg.player_location} instead of the ENTRY room 1')
+            moves += 1 + _play_to_exit(controller, p)
+        return moves
+
+    return run, run()
+
+
+def _layout_file(n):
+    """ Path of a layout file of make_layout(n), written once per size in the temporary directory """
+    path = os.path.join(tempfile.gettempdir(), f'dungeon_bench_{n}.layout')
+    if not os.path.exists(path):
+        write_layout(path, *make_layout(n))
+    return path
+
+
+# lookups
+
+@benchmark('find_room', sizes=(100, 10000), threshold=FAST_THRESHOLD)
+def find_room(n):
+    dg = new_dungeon(n)
+    ids = list(range(n))
+
+    def run():
+        for i in ids:
+            dg.find_room(i)
+    return run, n
+
+
+@benchmark('next_rooms', sizes=(100, 10000), threshold=FAST_THRESHOLD)
+def next_rooms(n):
+    dg = new_dungeon(n)
+    rooms = list(dg.rooms)
+
+    def run():
+        for room in rooms:
+            dg.next_rooms(room)
+    return run, n
+
+
+@benchmark('monster_property', sizes=(100, 10000), threshold=FAST_THRESHOLD)
+def monster_property(n):
+    dg = new_dungeon(n)
+    ids = list(range(n))
+
+    def run():
+        for i in ids:
+            dg.player_location = i
+            dg.monster
+    return run, n
+
+
+@benchmark('next_move_options', sizes=(10000,), threshold=FAST_THRESHOLD)
+def next_move_options(n):
+    """ next_move_options asked again without anything having changed, as every screen redraw does """
+    controller = GameController(new_dungeon(100))
+    controller.update_game_state(GameController.ENTER_DUNGEON, 'enter')
+
+    def run():
+        for _ in range(n):
+            controller.next_move_options()
+    return run, n
+
+
+@benchmark('dungeon_status', sizes=(10000,), threshold=FAST_THRESHOLD)
+def dungeon_status(n):
+    """ Counts of live monsters, unclaimed treasure and cleared rooms of a dungeon of n rooms """
+    dg = new_dungeon(n)
+    dg.status()
+    return dg.status, 1
+
+
+@benchmark('world_tick', sizes=(100000,))
+def world_tick(n):
+    """ Ticks of the world clock of a compact dungeon of n rooms, half of whose monsters are dead
+        (so the others have free rooms to move to), per tick; about n / 500 monsters move every tick
+    """
+    dg = new_dungeon(n, compact=True)
+    for room_id in list(dg.live_monsters)[::2]:
+        room = dg.find_room(room_id)
+        room.monster.is_alive = False
+        room.has_monster = False
+        dg.room_cleared(room_id)
+    world = MonsterWorld(dg, RandomStream(1), min_period=50, max_period=150)
+    world.advance(100)
+
+    return world.advance, 1
+
+
+# routes
+
+@benchmark('routes_build', sizes=(1000, 10000))
+def routes_build(n):
+    dg = new_dungeon(n)
+    return lambda: RouteIndex(dg), 1
+
+
+@benchmark('routes_lookup', sizes=(10000,), threshold=FAST_THRESHOLD)
+def routes_lookup(n):
+    dg = new_dungeon(n)
+    routes = dg.routes()
+    ids = list(range(n))
+
+    def run():
+        for i in ids:
+            routes.distance_to_exit(i)
+            routes.next_room(i)
+    return run, n
+
+
+@benchmark('routes_update', sizes=(10000,))
+def routes_update(n):
+    """ Removing and adding back a link in the middle of the dungeon, with the route index kept up to date """
+    dg = new_dungeon(n)
+    dg.routes()
+    src = n // 2
+
+    def run():
+        dg.remove_link(src, src + 1)
+        dg.add_link(src, src + 1)
+    return run, 1
+
+
+# game logic
+
+@benchmark('move_cycle', sizes=(10, 100))
+def move_cycle(n):
+    """ Complete games of n rooms: next_move_options, execute_move and update_game_state for every move
+        (the first option is always taken, and the player is healed so that it reaches the EXIT)
+    """
+    rooms, links = make_layout(n)
+    master = RandomStream(0)
+    games = 20
+    streams = master.spawn(games)
+
+    def run():
+        moves = 0
+        for rng in streams:
+            p = Player('Dangerous Dave', rng)
+            moves += _play_to_exit(GameController(Dungeon(p, rng, rooms, links)), p)
+        return moves
+
+    # the number of moves only depends on the seed
+    return run, run()
+
+
+@benchmark('lazy_move_cycle', sizes=(10, 100))
+def lazy_move_cycle(n):
+    """ move_cycle through generated dungeons of n layers (generator.LazyDungeon, chunks made as the player goes) """
+    from generator import DungeonGenerator, LazyDungeon
+    master = RandomStream(0)
+    games = 20
+    streams = master.spawn(games)
+
+    def run():
+        moves = 0
+        for seed, rng in enumerate(streams):
+            p = Player('Dangerous Dave', rng)
+            dg = LazyDungeon(p, DungeonGenerator(seed, depth=n, width=10), rng)
+            moves += _play_to_exit(GameController(dg), p)
+        return moves
+
+    return run, run()
+
+
+def _play_to_exit(controller, p):
+    """ Plays a game to the EXIT taking the first option, healing the player after every move; returns the moves """
+    moves = 0
+    while True:
+        options = controller.next_move_options()
+        x = str(options[1] if options[0] == 'move' else options[0])
+        result = controller.execute_move(x)
+        controller.update_game_state(result, x)
+        moves += 1
+        p.health = 10
+        p.is_alive = True
+        if controller.user_escaped(x):
+            return moves
+
+
+@benchmark('script_sessions', sizes=(1000,))
+def script_sessions(n):
+    """ n scripted sessions through ScriptDriver, most commands of which are rejected or come after the game ended """
+    script = ['enter', '1'] + ['fight', 'reward', 'xyzzy', '2', '3', '4', '5', '6', '7', 'escape'] * 4
+
+    def run():
+        driver = ScriptDriver(RandomStream(0))
+        for _ in driver.play_all([script] * n):
+            pass
+    return run, n * len(script)
+
+
+# battles
+
+@benchmark('battle_fight', sizes=(10000,), threshold=FAST_THRESHOLD)
+def battle_fight(n):
+    rng = RandomStream(0)
+    bm = BattleManager(rng)
+    p = Player('Dangerous Dave', rng, agility=6, health=10)
+    m = Monster('Beelzebub', rng, agility=6, health=10)
+
+    def run():
+        for _ in range(n):
+            p.health = m.health = 10
+            bm.fight(p, m)
+    return run, n
+
+
+@benchmark('battle_run', sizes=(10000,), threshold=FAST_THRESHOLD)
+def battle_run(n):
+    rng = RandomStream(0)
+    bm = BattleManager(rng)
+    p = Player('Dangerous Dave', rng, agility=6, health=10)
+    m = Monster('Beelzebub', rng, agility=6, health=10)
+
+    def run():
+        for _ in range(n):
+            p.health = 10
+            p.agility = 6
+            bm.run(p, m)
+    return run, n
+
+
+# streaming statistics
+
+@benchmark('game_stats_add', sizes=(100000,), threshold=FAST_THRESHOLD)
+def game_stats_add(n):
+    """ GameStats.add of n game results, one at a time (buffered and added in batches) """
+    from engine import GameResult
+    from stats import GameStats
+    results = [GameResult(i % 3 == 0, i % 3 == 1, i % 7, i % 5, i % 11, i % 9, i % 6, i % 40) for i in range(n)]
+
+    def run():
+        stats = GameStats()
+        for r in results:
+            stats.add(r)
+        stats.flush()
+    return run, n
+
+
+# rendering, with stdout redirected
+
+@benchmark('render_show_stats', sizes=(1000,))
+def render_show_stats(n):
+    rng = RandomStream(0)
+    p = Player('Dangerous Dave', rng)
+    monsters = [Monster('Beelzebub', rng) for _ in range(n)]
+    Display.assets.load()
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for m in monsters:
+                Display.show_stats(player=p, monster=m)
+                Display.renderer.flush()
+    return run, n
+
+
+@benchmark('render_show_stats_cold', sizes=(100,))
+def render_show_stats_cold(n):
+    """ show_stats with an empty asset cache every time, i.e. reading and composing the art files """
+    rng = RandomStream(0)
+    p = Player('Dangerous Dave', rng)
+    m = Monster('Beelzebub', rng)
+    warm = Display.assets
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(n):
+                Display.assets = AssetRegistry()
+                Display.show_stats(player=p, monster=m)
+                Display.renderer.flush()
+        Display.assets = warm
+    return run, n
+
+
+@benchmark('render_printfiles', sizes=(1000,))
+def render_printfiles(n):
+    Display.assets.load()
+    numbers = [f'{i}.txt' for i in range(1, 11)]
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(n):
+                Display.printfiles('dave.txt', numbers[i % 10], numbers[(i // 10) % 10])
+                Display.renderer.flush()
+    return run, n
+
+
+# cold start, in a new interpreter every time
+
+def _python(*args, stdin=b''):
+    """ Runs a new interpreter in the repository directory """
+    command = [sys.executable] + list(args)
+    return lambda: subprocess.run(command, input=stdin, cwd=os.path.dirname(HERE), check=True,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@benchmark('cold_python')
+def cold_python(n):
+    """ An empty interpreter, to tell the cost of the game from the cost of starting Python """
+    return _python('-c', 'pass'), 1
+
+
+@benchmark('cold_import')
+def cold_import(n):
+    return _python('-c', 'from dungeon import Dungeon, GameController, BattleManager'), 1
+
+
+@benchmark('cold_start_batch')
+def cold_start_batch(n):
+    """ python -m dungeon --batch up to the first prompt, then bye """
+    return _python('-m', 'dungeon', '--batch', stdin=b'bye\n'), 1
+
+
+def measure(f, size, scale, repeat, min_time=0.05):
+    """ Returns the timings of one benchmark at one size, in nanoseconds per operation
+        Like timeit, every timed run calls the benchmark as many times as needed to last at least
+        min_time seconds, and the garbage collector is paused while timing
+    """
+    run, ops = f(max(1, int(size * scale)) if size > 1 else 1)
+    run()       # warm up
+
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                run()
+            elapsed = time.perf_counter_ns() - start
+            if elapsed >= min_time * 1e9:
+                break
+            number *= 2
+
+        times = [elapsed / (number * ops)]
+        for _ in range(repeat - 1):
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                run()
+            times.append((time.perf_counter_ns() - start) / (number * ops))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {'ns_per_op': min(times), 'median_ns_per_op': statistics.median(times), 'ops': ops * number}
+
+
+def run_all(scale=1.0, repeat=5, name_filter=None, min_time=0.05):
+    results = {}
+    for name, (f, sizes, _) in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        for size in sizes:
+            key = f'{name}[{size}]' if len(sizes) > 1 or size > 1 else name
+            results[key] = measure(f, size, scale, repeat, min_time)
+            print(f"{key:32} {results[key]['median_ns_per_op']:>14,.0f} ns/op", file=sys.stderr)
+    return {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                 'platform': platform.platform(), 'node': platform.node(), 'scale': scale, 'repeat': repeat,
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+
+
+def measure_key(key, scale=1.0, repeat=5, min_time=0.05):
+    """ Measures again the benchmark of a result key (name or name[size]) """
+    name, _, size = key.partition('[')
+    f, sizes, _ = BENCHMARKS[name]
+    return measure(f, int(size[:-1]) if size else sizes[0], scale, repeat, min_time)
+
+
+def threshold_of(key, threshold=THRESHOLD):
+    """ Threshold of the benchmark of a result key: its own if it is looser than threshold """
+    entry = BENCHMARKS.get(key.split('[')[0])
+    if entry is None or entry[2] is None:
+        return threshold
+    return max(threshold, entry[2])
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """ Returns the lines of the comparison table and the names of the regressions
+        The medians are compared (a baseline without medians is compared by its best runs)
+    """
+    lines = [f"{'benchmark':32} {'baseline ns':>14} {'current ns':>14} {'ratio':>7} {'limit':>6}"]
+    regressions = []
+    for key, r in current['results'].items():
+        b = baseline['results'].get(key)
+        current_ns = r.get('median_ns_per_op', r['ns_per_op'])
+        if b is None:
+            lines.append(f"{key:32} {'-':>14} {current_ns:>14,.0f}")
+            continue
+        baseline_ns = b.get('median_ns_per_op', b['ns_per_op'])
+        ratio = current_ns / baseline_ns
+        limit = threshold_of(key, threshold)
+        flag = ''
+        if ratio > limit:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        lines.append(f"{key:32} {baseline_ns:>14,.0f} {current_ns:>14,.0f} {ratio:>7.2f} {limit:>6.2f}{flag}")
+    return lines, regressions
+
+
+def run_again(args):
+    """ Runs the benchmarks of args again in a new interpreter, returns its results """
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'results.json')
+        command = [sys.executable, os.path.abspath(__file__), '--scale', str(args.scale), '--repeat', str(args.repeat),
+                   '--min-time', str(args.min_time), '--out', out, '--baseline', os.path.join(tmp, 'none.json')]
+        if args.filter:
+            command += ['--filter', args.filter]
+        subprocess.run(command, check=True, stderr=subprocess.DEVNULL)
+        with open(out) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the Dungeon Dave hot paths')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the input sizes')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark, their median is compared')
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds every timed run lasts at least')
+    parser.add_argument('--filter', help='only run the benchmarks whose name contains this')
+    parser.add_argument('--out', help='write the results to this JSON file (stdout if not given)')
+    parser.add_argument('--baseline', default=BASELINE, help='results to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown ratio of the medians reported as a regression (some benchmarks have a looser one)')
+    parser.add_argument('--confirm', type=int, default=2,
+                        help='measure every regression again this many times, it is only reported if it is slower every time')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--baseline-runs', type=int, default=3,
+                        help='with --save-baseline, runs of every benchmark the middle one of which is stored')
+    args = parser.parse_args()
+
+    current = run_all(args.scale, args.repeat, args.filter, args.min_time)
+    if args.save_baseline:
+        # a baseline measured in a quiet (or busy) moment of the machine flags (or hides) regressions later,
+        # every benchmark keeps its middle run of several, each in a new interpreter as the compared runs are
+        runs = [current] + [run_again(args) for _ in range(args.baseline_runs - 1)]
+        for key in current['results']:
+            ordered = sorted((run['results'][key] for run in runs), key=lambda r: r['median_ns_per_op'])
+            current['results'][key] = ordered[len(ordered) // 2]
+        current['meta']['baseline_runs'] = len(runs)
+    text = json.dumps(current, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(text + '\n')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, run with --save-baseline to create one', file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('scale') != current['meta']['scale']:
+        print('warning: the baseline was measured with another --scale', file=sys.stderr)
+    for field in ('node', 'machine', 'python'):
+        if baseline['meta'].get(field) != current['meta'][field]:
+            print(f"warning: the baseline was measured with another {field} ({baseline['meta'].get(field)}), "
+                  f"timings only compare on one machine: regenerate it here with --save-baseline", file=sys.stderr)
+            break
+    lines, regressions = compare(current, baseline, args.threshold)
+    print('\n'.join(lines), file=sys.stderr)
+
+    # a slowdown that does not show again was the machine, not the code
+    for _ in range(args.confirm):
+        if not regressions:
+            break
+        print(f"measuring again: {', '.join(regressions)}", file=sys.stderr)
+        again = {'results': {key: measure_key(key, args.scale, args.repeat, args.min_time) for key in regressions}}
+        lines, regressions = compare(again, baseline, args.threshold)
+        print('\n'.join(lines[1:]), file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
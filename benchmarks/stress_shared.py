@@ -0,0 +1,115 @@
+""" Stress test of the shared multiplayer dungeon.
+    Worker threads play many players at once in one SharedDungeon, every player picking random options,
+    then the test checks that no treasure was picked up twice and no monster was killed twice, and
+    that the dungeon's entity sets agree with the rooms. The entity sets are first built while the players
+    play (every thread asks for the dungeon's status every --status commands), not before. Reports the commands per second for every
+    number of threads, with players that start spread over the dungeon or all at the ENTRY (--entry).
+
+    python benchmarks/stress_shared.py --rooms 10000 --players 2000 --threads 1 2 4 8
+    python benchmarks/stress_shared.py --rooms 200 --players 2000 --entry --switch 1e-6     (heavy contention)
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from dungeon.rng import PythonStream
+from dungeon.shared import SharedDungeon
+
+from bench import make_layout
+
+
+def play(controllers, pick, max_moves, counts, status_every):
+    """ Plays every controller to the end of its game, one after the other, and appends the number of commands to counts
+        Asks for the dungeon's status (which builds the entity sets the first time) every status_every commands
+    """
+    commands = 0
+    for gc in controllers:
+        for _ in range(max_moves):
+            if commands % status_every == 0:
+                gc.dungeon.status()
+            options = gc.next_move_options()
+            x = str(pick(options[1:]) if options[0] == 'move' else pick(options))
+            result = gc.execute_move(x)
+            gc.update_game_state(result, x)
+            commands += 1
+            if gc.is_game_running() == False or gc.user_escaped(x) == True:
+                break
+    counts.append(commands)
+
+
+def run(n_rooms, n_players, n_threads, spread, seed, status_every=100, max_moves=1000):
+    """ Plays n_players in one dungeon of n_rooms with n_threads threads, checks the dungeon afterwards
+        Returns (commands, seconds, claims, kills)
+    """
+    rooms, links = make_layout(n_rooms)
+    dg = SharedDungeon(PythonStream(seed), rooms, links)
+    # from the rooms, not from the entity sets: those are built while the game goes on
+    treasures = {room.id for room in dg.rooms if room.has_treasure}
+    monsters = {room.id for room in dg.rooms if room.has_monster}
+
+    starts = random.Random(seed)
+    controllers = [dg.join(f'Dave{i}', location=starts.randrange(n_rooms - 1) if spread else -1)
+                   for i in range(n_players)]
+
+    counts = []
+    threads = []
+    for t in range(n_threads):
+        pick = random.Random(seed * 1000 + t).choice
+        threads.append(threading.Thread(target=play, args=(controllers[t::n_threads], pick, max_moves, counts, status_every)))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    claims = [room_id for gc in controllers for room_id in gc.claims]
+    kills = [room_id for gc in controllers for room_id in gc.kills]
+    check(dg, treasures, monsters, claims, kills)
+    return sum(counts), elapsed, len(claims), len(kills)
+
+
+def check(dg, treasures, monsters, claims, kills):
+    """ Raises AssertionError if a treasure or a monster was taken twice or the dungeon is inconsistent """
+    assert len(claims) == len(set(claims)), 'a treasure was picked up twice'
+    assert len(kills) == len(set(kills)), 'a monster was killed twice'
+    assert set(claims) <= treasures, 'a treasure that did not exist was picked up'
+    assert set(kills) <= monsters, 'a monster that did not exist was killed'
+    assert dg.unclaimed_treasure == treasures - set(claims), 'unclaimed_treasure does not match the claims'
+    assert dg.live_monsters == monsters - set(kills), 'live_monsters does not match the kills'
+    for room in dg.rooms:
+        assert room.has_treasure == (room.id in dg.unclaimed_treasure)
+        assert room.has_monster == (room.id in dg.live_monsters)
+        if room.has_monster:
+            assert room.monster.is_alive and room.monster.health > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress test of the shared multiplayer dungeon')
+    parser.add_argument('--rooms', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--entry', action='store_true', help='every player starts at the ENTRY instead of a random room')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--switch', type=float, help='thread switch interval in seconds (smaller: more interleaving)')
+    parser.add_argument('--status', type=int, default=100, help='every thread asks for the status every STATUS commands')
+    args = parser.parse_args()
+
+    if args.switch:
+        sys.setswitchinterval(args.switch)
+    print(f'{args.rooms} rooms, {args.players} players, starting {"at the ENTRY" if args.entry else "spread"}'
+          f'{", GIL" if getattr(sys, "_is_gil_enabled", lambda: True)() else ", free threading"}')
+    for n_threads in args.threads:
+        commands, elapsed, claims, kills = run(args.rooms, args.players, n_threads, not args.entry, args.seed, args.status)
+        print(f'{n_threads:3} threads: {commands} commands in {elapsed:.2f}s, {commands / elapsed:,.0f} commands/s, '
+              f'{claims} treasures picked up, {kills} monsters killed, checks passed')
+
+
+if __name__ == '__main__':
+    main()
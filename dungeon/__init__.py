@@ -0,0 +1,33 @@
+""" Dungeon Dave: a text adventure in a dungeon full of monsters and treasures.
+    Importing the package has no side effects and loads almost nothing: the game classes are
+    imported the first time they are used, numpy when the first random stream is created and
+    the art files when they are first shown. Start the game with python -m dungeon (see cli.py).
+"""
+import importlib
+
+# public name -> module that defines it
+_EXPORTS = {
+    'Dungeon': 'game', 'DungeonMap': 'game', 'Room': 'game', 'Treasure': 'game', 'Creature': 'game',
+    'Player': 'game', 'Monster': 'game', 'BattleManager': 'game', 'GameController': 'game',
+    'RouteIndex': 'routes',
+    'SharedDungeon': 'shared', 'SharedController': 'shared',
+    'MonsterWorld': 'world',
+    'LayoutFile': 'layout',
+    'Display': 'display',
+    'main': 'cli',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'dungeon' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
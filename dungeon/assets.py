@@ -0,0 +1,81 @@
+""" In-memory cache of the art files used by the Display.
+    Every art file is read once, and the composed stat panels (big numbers next to the
+    player or monster picture) are built once per (who, health, agility) combination.
+"""
+import os
+
+# all art files shipped with the game
+ART_FILES = ('0.txt', '1.txt', '2.txt', '3.txt', '4.txt', '5.txt', '6.txt', '7.txt', '8.txt', '9.txt', '10.txt',
+             'agility.txt', 'bigspace.txt', 'dave.txt', 'escape.txt', 'health.txt',
+             'monster.txt', 'monster01.txt', 'monster02.txt',
+             'splash00.txt', 'splash01.txt', 'treasure01.txt')
+
+# picture shown on the left of a stat panel
+STAT_PICTURES = {'header': 'bigspace.txt', 'dave': 'dave.txt', 'monster': 'monster.txt'}
+
+
+class AssetRegistry:
+    """ Loads the art files and keeps them in memory
+        Files are looked up in directory (the art directory of the package by default)
+    """
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'art')
+        self.directory = directory
+        self.files = {}         # file name -> list of lines
+        self.composed = {}      # (file1, file2, file3) -> text of the three files side by side
+        self.panels = {}        # (who, health, agility) -> composed stat panel
+        self.reads = 0          # number of files read
+
+    def load(self):
+        """ Reads every art file, called once at startup """
+        for name in ART_FILES:
+            self.lines(name)
+
+    def lines(self, name):
+        """ Returns the lines of an art file, reading it only the first time it is asked for """
+        lines = self.files.get(name)
+        if lines is None:
+            with open(os.path.join(self.directory, name), 'r', encoding='utf8') as f:
+                lines = f.readlines()
+            self.reads += 1
+            self.files[name] = lines
+        return lines
+
+    def text(self, name):
+        """ Returns the content of an art file """
+        return ''.join(self.lines(name))
+
+    def compose(self, file1, file2, file3):
+        """ Appends each line of the 2nd and 3rd file to the same line of the first file
+            (there are as many lines as in the first file)
+        """
+        key = (file1, file2, file3)
+        text = self.composed.get(key)
+        if text is None:
+            lines2 = self.lines(file2)
+            lines3 = self.lines(file3)
+            parts = []
+            for i, line1 in enumerate(self.lines(file1)):
+                line2 = lines2[i] if i < len(lines2) else ''
+                line3 = lines3[i] if i < len(lines3) else ''
+                parts.append(line1.replace('\n', ' '))
+                parts.append(line2.replace('\n', ' '))
+                parts.append(line3)
+            text = ''.join(parts)
+            self.composed[key] = text
+        return text
+
+    def stat_panel(self, who, health=None, agility=None):
+        """ Returns the stat panel of who ('dave' or 'monster') with its health and agility in big numbers
+            who='header' returns the HEALTH / AGILITY titles
+        """
+        key = (who, health, agility)
+        panel = self.panels.get(key)
+        if panel is None:
+            if who == 'header':
+                panel = self.compose(STAT_PICTURES[who], 'health.txt', 'agility.txt')
+            else:
+                panel = self.compose(STAT_PICTURES[who], f'{health}.txt', f'{agility}.txt')
+            self.panels[key] = panel
+        return panel
@@ -0,0 +1,139 @@
+""" Command line entry point of the game: python -m dungeon [help | redraw] [--no-splash] [--batch] [--wander] [--layout FILE] """
+import argparse
+import os
+import signal
+import time
+
+from .game import Dungeon, GameController, Player
+from .display import Display
+from .metrics import metrics
+from .rng import PythonStream
+from .world import MonsterWorld
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m dungeon', description='Dungeon Dave')
+    parser.add_argument('command', nargs='?', choices=('help', 'redraw'),
+                        help='help: show the help screen, redraw: redraw the screen every turn instead of scrolling')
+    parser.add_argument('--no-splash', action='store_true', help='skip the splash screen, art files are read when first shown')
+    parser.add_argument('--batch', action='store_true',
+                        help='no art at all and no splash screen, e.g. to play from a script or a pipe')
+    parser.add_argument('--wander', action='store_true', help='monsters wander from room to room as the game goes on')
+    parser.add_argument('--layout', help='play the rooms and links of a layout file (see python -m dungeon.layout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # if user asked for help, then print the game logo and help screen and exit
+    if args.command == 'help':
+        splashfiles = ["splash01.txt"]
+        Display.ascii_screen(splashfiles, delay=0, repeats=1)
+        Display.help()
+        Display.renderer.close()
+        return 0
+    elif args.command == 'redraw':
+        # redraw the screen every turn instead of scrolling
+        Display.renderer.redraw = True
+
+    if args.batch:
+        Display.pictures = False
+    elif not args.no_splash:
+        # read all the art files once
+        Display.assets.load()
+
+        # splash screen for game
+        splashfiles = ["splash00.txt"]
+        Display.ascii_screen(splashfiles, delay=2, repeats=1)
+
+    # initiate the main game objects; a game only needs a few dozen draws, numpy is not worth loading for them
+    rng = PythonStream()
+    p = Player('Dangerous Dave', rng)
+    dg = Dungeon(p, rng, layout=args.layout)
+    gc = GameController(dg)
+    world = MonsterWorld(dg, rng, min_period=2, max_period=6) if args.wander else None
+
+    Display.welcome(p)
+
+    # metrics and profiler (off unless asked for, see metrics.py)
+    metrics.add_collector(lambda: {'rng_draws_total': rng.draws(), 'asset_file_reads_total': Display.assets.reads,
+                                   'live_monsters': len(dg.live_monsters), 'unclaimed_treasure': len(dg.unclaimed_treasure)})
+    if metrics.enabled:
+        if os.environ.get('DUNGEON_PROFILE'):
+            metrics.start_profiler(float(os.environ['DUNGEON_PROFILE']))
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: metrics.toggle_profiler())
+
+    # the metrics are written and the profiler stopped however the game ends (Ctrl-C included)
+    try:
+        play(gc, dg, world)
+    finally:
+        if metrics.enabled:
+            metrics.stop_profiler()
+            metrics.dump(os.environ['DUNGEON_METRICS'])
+        Display.renderer.close()
+    return 0
+
+
+def play(gc, dg, world):
+    """ The game loop, until the player quits, dies or escapes """
+    while True:
+        t = metrics.start()
+
+        # step 1: what are the valid options to show the player?
+        next_moves = gc.next_move_options()
+
+        # show the options
+        Display.show_moves(next_moves)
+        t = metrics.lap('next_move_options', t)
+
+        x = 'badIO'
+        i = 0
+        # take the input (the end of a piped input is the same as bye)
+        while x == 'badIO':
+            if i > 0:
+                Display.out('Please provide a valid option')
+            try:
+                x = gc.validate_input(next_moves, x)
+            except EOFError:
+                x = 'bye'
+            i += 1
+        metrics.count('invalid_inputs_total', n=i - 1)
+        t = metrics.lap('validate_input', t)
+
+        if x == 'bye':
+            break
+
+        # process the input
+        result = gc.execute_move(x)
+        if metrics.enabled:
+            command = 'move' if x.isdecimal() else x
+            metrics.count('commands_total', (('command', command),))
+            metrics.count('results_total', (('result', GameController.RESULT_NAMES.get(result, 'NONE')),))
+            metrics.observe('command_seconds', time.perf_counter_ns() - t, (('command', command),))
+        t = metrics.lap('execute_move', t)
+
+        # show the outcome of the fight or running away
+        Display.show_result(result, dg)
+        t = metrics.lap('show_result', t)
+
+        # update the state
+        gc.update_game_state(result, x)
+        t = metrics.lap('update_game_state', t)
+
+        # check if game ended
+        if gc.is_game_running() == False:
+            break
+
+        if gc.user_escaped(x) == True:
+            Display.show_final_screen()
+            break
+
+        # one tick of the world clock per move: wandering monsters may walk into the player's room
+        if world is not None:
+            room = dg.get_current_room()
+            had_monster = room is not None and room.has_monster
+            world.advance()
+            if room is not None and room.has_monster and not had_monster:
+                Display.monster_arrives(dg)
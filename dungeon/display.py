@@ -0,0 +1,230 @@
+""" Text display of the game: every screen, picture and message shown to the player """
+from .assets import AssetRegistry
+from .render import Renderer
+from .game import Room, GameController
+
+class Display:
+    """ Renders the game (dungeon, stats, etc.) on the screen.
+        There is only one display in the game hence all methods are static.
+        Art files are read once into the asset registry, rendering never touches the disk afterwards.
+        Output is collected by the renderer and written one frame at a time, call Display.renderer.flush()
+        before waiting for the player.
+    """
+    assets = AssetRegistry()
+    renderer = Renderer()
+    pictures = True         # False in batch mode: no art at all, stats are shown as text
+
+    @staticmethod
+    def out(*args, **kwargs):
+        """ Adds text to the current frame, takes the same arguments as print() """
+        Display.renderer.write(*args, **kwargs)
+
+    @staticmethod
+    def help():
+        """ Prints help in how to play the game
+        """
+        Display.out('-----------------------------------------------------------------------')
+        Display.out('------------------------------HELP-------------------------------------')
+        Display.out('-----------------------------------------------------------------------')
+        Display.out('To START game: python -m dungeon                                     ')
+        Display.out('To START game redrawing the screen every turn: python -m dungeon redraw')
+        Display.out('To START game without splash screen: python -m dungeon --no-splash    ')
+        Display.out('To PLAY without any art (e.g. from a script): python -m dungeon --batch')
+        Display.out('To PLAY with wandering monsters: python -m dungeon --wander             ')
+        Display.out('-----------------------------------------------------------------------')
+        Display.out('To EXIT the game at any time type "bye" without the quotes             ')
+        Display.out('-----------------------------------------------------------------------')
+        Display.out('Follow the instructions provided in the game and type commands such as:')
+        Display.out('      reward -- to pick up a reward')
+        Display.out('      fight  -- to fight a monster')
+        Display.out('      run    -- to run away from a monster')
+        Display.out('-----------------------------------------------------------------------')
+        Display.out('-----------------------------------------------------------------------')
+
+    @staticmethod
+    def show_rooms(rooms):
+        """ Displays the room(s)
+            It can accept either a list of rooms or a single room as parameters
+            Does not return anything, it prints room details on the screen
+        """
+        if isinstance(rooms, Room):
+            r = rooms
+            Display.out(f'Room Id:{r.id}, Type:{r.room_type}, Has monster:{r.has_monster}, Has treasure:{r.has_treasure}')
+        elif  isinstance(rooms, list):
+            for r in rooms:
+                if isinstance(r, Room):
+                    Display.out(f'Room Id:{r.id}, Type:{r.room_type}, Has monster:{r.has_monster}, Has treasure:{r.has_treasure}')
+                else:
+                    Display.out(f'Error: parameter expected was Room or list of rooms, received {type(r)}')        
+        else:
+            Display.out(f'Error: parameter expected was Room or list of rooms, received {type(rooms)}')        
+
+    @staticmethod
+    def show_moves(next_moves):
+
+        if len(next_moves) > 1:
+            if next_moves[0] == 'move':
+                Display.out(f'You are ready to move to the next room. Pick your room number:')
+                for m in range(1, len(next_moves)):
+                    Display.out(f'\t{next_moves[m]}')
+                return
+
+        if next_moves[0] == 'escape':
+            Display.out(f'You have reached the exit! Just open the door:')
+            Display.out(f'\t{next_moves[0]}')
+            return
+
+        Display.out(f'What will you do:')
+        for o in next_moves:
+            Display.out(f'\t{o}')
+
+    stat_to_file = {1:'1.txt', 2:'2.txt', 3:'3.txt', 4:'4.txt',5:'5.txt',6:'6.txt',7:'7.txt',8:'8.txt',9:'9.txt',10:'10.txt'}
+
+    @staticmethod
+    def show_stats(player=None, monster=None):
+        """ Displays the statistics in big graphics using the unicode files that contain numbers and screen prints
+        """
+        if not Display.pictures:
+            if player != None:
+                Display.out(f'{player.name}: health {player.health}, agility {player.agility}')
+            if monster != None:
+                Display.out(f'{monster.name}: health {monster.health}, agility {monster.agility}')
+            return
+
+        # print stat header
+        Display.out(Display.assets.stat_panel('header'))
+
+        if player != None:
+            Display.out(Display.assets.stat_panel('dave', player.health, player.agility))
+
+        if monster != None:
+            Display.out(Display.assets.stat_panel('monster', monster.health, monster.agility))
+
+    @staticmethod
+    def printfiles(file1, file2, file3, delay = 1, repeats = 1):
+        """ Takes 3 files as inputs, and appends the lines of each file to the next file
+        """
+        Display.out(Display.assets.compose(file1, file2, file3))
+
+    @staticmethod
+    def show_final_screen():
+        """ Shows the goodbye screen of the game """
+        escape_file = ["escape.txt"]
+        Display.ascii_screen(escape_file)
+
+
+    @staticmethod
+    def show_result(result, dungeon):
+        """ Shows the outcome of the users action on the screen
+        """
+        rm = dungeon.get_current_room()
+        p = dungeon.player
+        if result == GameController.PLAYER_WON:
+            m = rm.monster
+            if m.is_alive == False:
+                Display.out("Player KILLS Monster")
+            else:
+                Display.out("Player inflicts damage on Monster")
+                Display.show_stats(player=p, monster=m)
+        elif result == GameController.MONSTER_WON:
+            if p.is_alive == False:
+                Display.out("Monster KILLS Player")
+            else:
+                Display.out("Monster inflicts damage on Player")
+                m = rm.monster
+                Display.show_stats(player=p, monster=m)
+        elif result == GameController.PICK_UP_REWARD:
+            t = rm.treasure
+            Display.out(f'Treasure contained health:{t.health_reward} and agility:{t.agility_reward}')
+            #Display.out(f'Player stats updated to health:{p.health} and agility:{p.agility} updated')
+            Display.show_stats(player=p)
+        elif result == GameController.PLAYER_RAN_UNHURT:
+            Display.out("Player ran away with no damage. Lucky!")
+            # if the new room has a monster then show the monster and the stats
+            if rm.has_monster == True:
+                monsterfiles = ['monster01.txt']
+                m = rm.monster
+                Display.ascii_screen(monsterfiles)
+                Display.show_stats(player=p, monster=m)
+            elif rm.has_treasure == True:
+                treasurefiles = ['treasure01.txt']
+                Display.ascii_screen(treasurefiles)
+            else:
+                Display.show_stats(player=p)
+        elif result == GameController.PLAYER_RAN_HURT:
+            Display.out("Player ran away with some damage")
+            Display.show_stats(player=p)
+            # if the room has a monster then show the monster and the stats
+            if rm.has_monster == True:
+                monsterfiles = ['monster01.txt']
+                m = rm.monster
+                Display.ascii_screen(monsterfiles)
+                Display.show_stats(player=p, monster=m)
+            elif rm.has_treasure == True:
+                treasurefiles = ['treasure01.txt']
+                Display.ascii_screen(treasurefiles)
+        elif result == GameController.PLAYER_DIED:
+            Display.out("Player killed by monster while trying to run. Welcome grim reaper.")
+        elif result == GameController.ENTERED_ROOM:
+            # if the room has a monster then show the monster and the stats
+            if rm.has_monster == True:
+                monsterfiles = ['monster01.txt']
+                m = rm.monster
+                Display.ascii_screen(monsterfiles)
+                Display.show_stats(player=p, monster=m)
+            elif rm.has_treasure == True:
+                treasurefiles = ['treasure01.txt']
+                Display.ascii_screen(treasurefiles)
+
+    @staticmethod
+    def monster_arrives(dungeon):
+        """ Shows the wandering monster that walked into the player's room """
+        Display.out('A monster wanders into the room!')
+        Display.ascii_screen(['monster01.txt'])
+        Display.show_stats(player=dungeon.player, monster=dungeon.monster)
+
+    @staticmethod
+    def fight_result(dungeon, winner):
+        p = dungeon.player
+        m = dungeon.monster
+
+
+        # if player is the winner
+        if winner == 0:
+            if m.is_alive == False:
+                Display.out("Player KILLS Monster")
+            else:
+                Display.out("Player inflicts damage on Monster")
+        else:
+            if p.is_alive == False:
+                Display.out("Monster KILLS Player")
+            else:
+                Display.out("Monster inflicts damage on Player")
+
+    @staticmethod
+    def ascii_screen(filenames, delay = 1, repeats = 1):
+        if not Display.pictures:
+            return
+        frames = [Display.assets.text(name) for name in filenames]
+
+        # each frame stays on screen for delay seconds, without blocking the game loop
+        Display.renderer.animate(frames, delay, repeats)
+
+    @staticmethod
+    def welcome(p):
+        Display.out(f'Welcome {p.name}!')
+        Display.out(f'You are about to enter a DUNGEON in which reside RANDOMLY generated MONSTERS and TREASURES')
+        Display.out('')
+        Display.out(f'Your vital statistics bestowed upon you by birth are:')
+        Display.out('--------------------------------------------------------')
+        ddata = '{name:<20s} {health:<10s} {agility:<10s}'.format(name='NAME', health='HEALTH', agility='AGILITY')
+        Display.out(ddata)
+        ddata = '{name:<20s} {health:<10d} {agility:<10d}'.format(name=p.name, health=p.health, agility=p.agility)
+        Display.out(ddata)
+        Display.out('--------------------------------------------------------')
+        Display.out('')
+        Display.out(f'The MONSTERS you fight will have their own health and agility')
+        Display.out(f'BUT ... sometimes ... if you are lucky .... you will be rewarded with TREASURE that will replenish your vitals')
+        Display.out(f'You can either fight or run ... but you MUST get out of this dungeon ... or DIE a watery death')
+        Display.out('')
+        Display.out('')
@@ -0,0 +1,920 @@
+""" The game itself: the dungeon and its rooms, the creatures, the battles and the game controller.
+    Nothing here prints or reads art files (see display.py), and numpy and the compact storage
+    are only imported by the room creation methods that need them.
+"""
+import gc
+from array import array
+from collections.abc import Mapping
+from .rng import default_stream
+
+class Dungeon:
+    """ Represents the dungeon which consists of rooms
+        It contains rooms, how rooms are linked to each other and has methods that help navigate the dungeon
+    """
+    # list of rooms
+    init_rooms = {0: ('ENTRY'), 1: ('MURKY', 'Beelzebub'), 2: ('MURKY', 'Gobblezebub'), 3: ('MURKY', 'Devilzebub'), 4: ('MURKY', 'Beetlejuice'), 5: ('EXIT')}
+
+    # rooms linked to other rooms
+    room_links = ((0, 1), (1, 2), (2, 3), (2, 4), (3, 4), (4, 5))
+
+    def __init__(self, player, rng=None, rooms=None, links=None, bulk=False, compact=False, store=None, layout=None):
+        """ Loads the dungeon map, i.e., creates Room objects and sets them in a list
+            Creates and sets the monsters into the rooms, creates and sets treasures as well
+            Sets the player location to the ENTRY room (note: player object is not set, just the location)
+            All random rolls are drawn from rng (a RandomStream), the shared default stream if not given
+            rooms and links default to Dungeon.init_rooms and Dungeon.room_links
+            With bulk=True all rooms are populated with a few vectorized draws (see _create_rooms_bulk)
+            With compact=True the rooms are populated the same way and kept in an EntityStore (a few bytes
+            per room), self.rooms then holds views of the stored rooms (see _create_rooms_compact)
+            With store (an EntityStore whose rooms are already populated, e.g. restored from a snapshot)
+            nothing is rolled and the dungeon uses the rooms of the store
+            With layout (a LayoutFile or the path of one, see layout.py) the rooms and links are read from a
+            memory-mapped layout file instead of rooms and links: the links are used in place, and a compact
+            dungeon reads the room types and the monster names straight from the file
+        """
+        self.player_location = -1        # id of room that player is currently in
+        self.player = player
+        self.rng = rng if rng is not None else default_stream()
+        self.room_connections = None    # dictionary showing connection of room to other rooms
+        self.rooms = []                 # list of rooms in the dungeon, in the order of init_rooms
+        self.room_index = {}            # room id -> position of the room in self.rooms
+
+        self._init_indexes()
+        if layout is not None:
+            self._open_layout(layout, bulk, compact)
+        elif store is not None:
+            self.store = store
+            self.rooms = store.rooms
+            self.room_index = store.index
+        elif compact:
+            self._create_rooms_compact(Dungeon.init_rooms if rooms is None else rooms)
+        elif bulk:
+            self._create_rooms_bulk(Dungeon.init_rooms if rooms is None else rooms)
+        else:
+            self._create_rooms(Dungeon.init_rooms if rooms is None else rooms)
+        if layout is None:
+            self._link_rooms(Dungeon.room_links if links is None else links)
+
+    def _open_layout(self, layout, bulk, compact):
+        """ Creates the rooms of a layout file and uses its links """
+        from .layout import LayoutFile
+        if not isinstance(layout, LayoutFile):
+            layout = LayoutFile(layout)
+        self.layout = layout
+        if compact:
+            self._create_rooms_compact(None, layout=layout)
+        elif bulk:
+            self._create_rooms_bulk(layout.init_rooms())
+        else:
+            self._create_rooms(layout.init_rooms())
+
+        # rooms are created in the order of the file, so its CSR arrays are the links by position already
+        self.link_offsets = layout.link_offsets
+        self.link_targets = layout.link_targets
+        self.dungeon_map = DungeonMap(self)
+
+    def _init_indexes(self):
+        """ Sets the storage, route and entity indexes of an empty dungeon (also called by subclasses that
+            create their rooms their own way, e.g. generator.LazyDungeon)
+        """
+        self.store = None               # EntityStore holding the rooms (compact dungeons only)
+        self._init_rooms = None         # rooms the Room objects were rolled from by _create_rooms (see reset)
+        self.layout = None              # LayoutFile the rooms and links were read from, if any
+        self._routes = {}               # avoid_monsters -> RouteIndex, built when first asked for (see routes())
+        self.version = 0                # changes whenever a room or a link changes (see room_changed)
+
+        # ids of the rooms with a living monster, with unclaimed treasure, and of the rooms that held a
+        # monster or a treasure and hold neither anymore; built when first asked for (see live_monsters)
+        self._live_monsters = None
+        self._unclaimed_treasure = None
+        self._cleared_rooms = None
+        self._entry = None              # id of the ENTRY room, found when first asked for (see entry_room)
+
+    def _create_rooms(self, init_rooms):
+        """ Creates the rooms and populates them with monsters and treasures """
+        self._init_rooms = init_rooms
+        for k, v in init_rooms.items():
+
+            # create the room with room id and type of room
+            if isinstance(v, str):
+                room = Room(k, v, self.rng)       # ENTRY and EXIT rooms
+            else:
+                room = Room(k, v[0], self.rng)    # MURKY rooms are in a tuple with monster names
+                self._populate(room, v[1])
+
+            self.room_index[room.id] = len(self.rooms)
+            self.rooms.append(room)
+
+    def _populate(self, room, monster_name):
+        """ Creates the monster or the treasure of a MURKY room whose type was just rolled """
+        if room.room_type == 'MONSTER':
+            room.monster = Monster(monster_name, self.rng)     # create monster and set its name
+            room.has_monster = True
+        elif room.room_type == 'TREASURE':
+            room.treasure = Treasure(self.rng)
+            room.has_treasure = True
+
+    def reset(self, player, rng=None):
+        """ Starts a new game in the same dungeon: the player is outside and the rooms are rolled again from
+            rng (the dungeon's stream if not given) with the same draws as Dungeon(player, rng, rooms, links)
+            The Room objects, the room index and the links are kept, so a new game costs the draws only.
+            Only dungeons whose rooms are created one by one (not bulk, compact or from a store) can be reset.
+        """
+        if self._init_rooms is None:
+            raise ValueError('only a dungeon created without bulk, compact or store can be reset')
+        self.player = player
+        if rng is not None:
+            self.rng = rng
+        self.player_location = -1
+        self._routes = {}
+        self._live_monsters = None
+        self._unclaimed_treasure = None
+        self._cleared_rooms = None
+        self.version += 1               # options cached for the last game are stale
+        for room, v in zip(self.rooms, self._init_rooms.values()):
+            if isinstance(v, str):
+                room.__init__(room.id, v)
+            else:
+                room.__init__(room.id, v[0], self.rng)
+                self._populate(room, v[1])
+
+    def _create_rooms_bulk(self, init_rooms, rng=None):
+        """ Same as _create_rooms, but the room types, monster stats and treasure rewards of all the rooms
+            are drawn at once with a few vectorized calls instead of a few draws per object
+            Draws from rng if given, from the dungeon's stream otherwise
+        """
+        if rng is None:
+            rng = self.rng
+        gen = rng.generator
+        murky = [v for v in init_rooms.values() if not isinstance(v, str)]
+        is_monster = (gen.random(len(murky)) < 0.75).tolist()
+        stats = gen.integers(2, 11, size=(len(murky), 2)).tolist()      # monster agility and health
+        rewards = gen.integers(2, 9, size=(len(murky), 2)).tolist()     # treasure agility and health rewards
+
+        # the rooms hold no reference cycles, so the cyclic garbage collector (which would otherwise
+        # run many times while the objects are allocated) is paused until they are all created
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._add_rooms(init_rooms, is_monster, stats, rewards)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _add_rooms(self, init_rooms, is_monster, stats, rewards):
+        """ Creates the rooms of _create_rooms_bulk from the values drawn for the MURKY rooms """
+        m = 0
+        for k, v in init_rooms.items():
+            if isinstance(v, str):
+                room = Room(k, v)       # ENTRY and EXIT rooms
+            else:
+                if is_monster[m]:
+                    room = Room(k, 'MONSTER')
+                    room.monster = Monster(v[1], agility=stats[m][0], health=stats[m][1])
+                    room.has_monster = True
+                else:
+                    room = Room(k, 'TREASURE')
+                    room.treasure = Treasure(agility_reward=rewards[m][0], health_reward=rewards[m][1])
+                    room.has_treasure = True
+                m += 1
+
+            self.room_index[room.id] = len(self.rooms)
+            self.rooms.append(room)
+
+    def _create_rooms_compact(self, init_rooms, rng=None, layout=None):
+        """ Same draws as _create_rooms_bulk, but the results are written straight into the typed arrays
+            of an EntityStore instead of creating Room, Monster and Treasure objects
+            With layout (a LayoutFile) the rooms are those of the file and init_rooms is not used
+        """
+        import numpy as np
+        from .store import EntityStore, ROOM_TYPE_CODES
+
+        if rng is None:
+            rng = self.rng
+        gen = rng.generator
+        if layout is not None:
+            # room types straight from the file, its MURKY rooms are populated
+            store = EntityStore(array('q', layout.ids.tobytes()))
+            room_type = np.frombuffer(layout.room_types, dtype=np.int8).copy()
+            murky = room_type == ROOM_TYPE_CODES['MURKY']
+            monster_name = layout.monster_name
+        else:
+            values = list(init_rooms.values())
+            store = EntityStore(list(init_rooms.keys()))
+            room_type = np.array([ROOM_TYPE_CODES[v] if isinstance(v, str) else 0 for v in values], dtype=np.int8)
+            murky = np.array([not isinstance(v, str) for v in values], dtype=bool)
+            monster_name = lambda i: values[i][1]
+        n = len(store)
+
+        murky_pos = np.nonzero(murky)[0]
+        m = len(murky_pos)
+        is_monster_m = gen.random(m) < 0.75
+        stats = gen.integers(2, 11, size=(m, 2))        # monster agility and health
+        rewards = gen.integers(2, 9, size=(m, 2))       # treasure agility and health rewards
+
+        # ENTRY and EXIT keep their own type, MURKY rooms become MONSTER or TREASURE rooms
+        room_type[murky_pos] = np.where(is_monster_m, ROOM_TYPE_CODES['MONSTER'], ROOM_TYPE_CODES['TREASURE'])
+        monster_pos = murky_pos[is_monster_m]
+        treasure_pos = murky_pos[~is_monster_m]
+
+        def column(pos, column_values):
+            """ Typed array with column_values at positions pos and 0 everywhere else """
+            col = np.zeros(n, dtype=np.int8)
+            col[pos] = column_values
+            return array('b', col.tobytes())
+
+        store.room_type = array('b', room_type.tobytes())
+        store.has_monster = column(monster_pos, 1)
+        store.monster_alive = column(monster_pos, 1)
+        store.monster_agility = column(monster_pos, stats[is_monster_m, 0])
+        store.monster_health = column(monster_pos, stats[is_monster_m, 1])
+        store.monster_room = array('q', store.ids)
+        for i in monster_pos.tolist():
+            store.monster_name[i] = monster_name(i)
+
+        store.has_treasure = column(treasure_pos, 1)
+        store.has_treasure_slot = column(treasure_pos, 1)
+        store.agility_reward = column(treasure_pos, rewards[~is_monster_m, 0])
+        store.health_reward = column(treasure_pos, rewards[~is_monster_m, 1])
+
+        self.store = store
+        self.rooms = store.rooms
+        self.room_index = store.index
+
+    def _link_rooms(self, room_links):
+        """ Builds the connections between rooms as CSR arrays (compressed sparse rows):
+            the rooms that room self.rooms[i] connects to are
+            self.rooms[j] for j in link_targets[link_offsets[i]:link_offsets[i + 1]], in the order of room_links
+            Links to unknown rooms and links of a room to itself are ignored. Runs in linear time.
+        """
+        self.link_offsets, self.link_targets = link_arrays(room_links, self.room_index, len(self.rooms))
+        self.dungeon_map = DungeonMap(self)
+
+    def _own_links(self):
+        """ Copies the links of a layout file into arrays of the dungeon before they are changed """
+        if not isinstance(self.link_targets, array):
+            self.link_offsets = array('q', self.link_offsets.tobytes())
+            self.link_targets = array('q', self.link_targets.tobytes())
+
+    def add_link(self, src, dst):
+        """ Links room src to room dst (after its other links), and updates the route indexes """
+        i = self.room_index[src]
+        j = self.room_index[dst]
+        if i == j:
+            return
+        self._own_links()
+        self.link_targets.insert(self.link_offsets[i + 1], j)
+        self.link_offsets[i + 1:] = array('q', [k + 1 for k in self.link_offsets[i + 1:]])
+        self.dungeon_map._connections.pop(src, None)
+        self.version += 1
+        for routes in self._routes.values():
+            routes.link_added(src, dst)
+
+    def remove_link(self, src, dst):
+        """ Removes the link of room src to room dst, and updates the route indexes
+            Raises ValueError if there is no such link
+        """
+        i = self.room_index[src]
+        j = self.room_index[dst]
+        self._own_links()
+        start, end = self.link_offsets[i], self.link_offsets[i + 1]
+        targets = self.link_targets[start:end]
+        if j not in targets:
+            raise ValueError(f'room {src} is not linked to room {dst}')
+        del self.link_targets[start + targets.index(j)]
+        self.link_offsets[i + 1:] = array('q', [k - 1 for k in self.link_offsets[i + 1:]])
+        self.dungeon_map._connections.pop(src, None)
+        self.version += 1
+        for routes in self._routes.values():
+            routes.link_removed(src, dst)
+
+    def routes(self, avoid_monsters=False):
+        """ The RouteIndex of the dungeon: distances to the EXIT and next rooms on the shortest routes
+            With avoid_monsters=True the routes do not go through rooms with a living monster
+            Built the first time it is asked for, then kept up to date as links change and rooms are cleared
+        """
+        routes = self._routes.get(avoid_monsters)
+        if routes is None:
+            from .routes import RouteIndex
+            routes = RouteIndex(self, avoid_monsters)
+            self._routes[avoid_monsters] = routes
+        return routes
+
+    def room_cleared(self, room_id):
+        """ Called when the monster of the room died """
+        self.room_changed(room_id)
+        for routes in self._routes.values():
+            routes.room_cleared(room_id)
+
+    def room_blocked(self, room_id):
+        """ Called when a living monster moved into the room """
+        self.room_changed(room_id)
+        for routes in self._routes.values():
+            routes.room_blocked(room_id)
+
+    def room_changed(self, room_id):
+        """ Called after has_monster or has_treasure of the room changed (room_cleared and room_blocked call it):
+            moves the room to the right entity sets and invalidates the cached move options
+        """
+        self.version += 1
+        if self._live_monsters is None:
+            return
+        room = self.find_room(room_id)
+        self._live_monsters.discard(room_id)
+        self._unclaimed_treasure.discard(room_id)
+        self._cleared_rooms.discard(room_id)
+        if room.has_monster:
+            self._live_monsters.add(room_id)
+        if room.has_treasure:
+            self._unclaimed_treasure.add(room_id)
+        if not room.has_monster and not room.has_treasure and (room.monster is not None or room.treasure is not None):
+            self._cleared_rooms.add(room_id)
+
+    def _index_entities(self):
+        """ Builds the sets of rooms with a living monster, with unclaimed treasure and of cleared rooms """
+        live, unclaimed, cleared = set(), set(), set()
+        if self.store is not None:
+            # straight from the typed arrays, without creating a view per room
+            store = self.store
+            for room_id, has_monster, has_treasure, name, has_slot in zip(
+                    store.ids, store.has_monster, store.has_treasure, store.monster_name, store.has_treasure_slot):
+                if has_monster:
+                    live.add(room_id)
+                if has_treasure:
+                    unclaimed.add(room_id)
+                if not has_monster and not has_treasure and (name is not None or has_slot):
+                    cleared.add(room_id)
+        else:
+            for room in self.rooms:
+                if room.has_monster:
+                    live.add(room.id)
+                if room.has_treasure:
+                    unclaimed.add(room.id)
+                if not room.has_monster and not room.has_treasure and (room.monster is not None or room.treasure is not None):
+                    cleared.add(room.id)
+        self._live_monsters, self._unclaimed_treasure, self._cleared_rooms = live, unclaimed, cleared
+
+    @property
+    def live_monsters(self):
+        """ Ids of the rooms with a living monster (a set kept up to date by the dungeon, do not modify it) """
+        if self._live_monsters is None:
+            self._index_entities()
+        return self._live_monsters
+
+    @property
+    def unclaimed_treasure(self):
+        """ Ids of the rooms whose treasure has not been picked up (kept up to date, do not modify it) """
+        if self._unclaimed_treasure is None:
+            self._index_entities()
+        return self._unclaimed_treasure
+
+    @property
+    def cleared_rooms(self):
+        """ Ids of the rooms whose monster died or whose treasure was picked up (kept up to date, do not modify it) """
+        if self._cleared_rooms is None:
+            self._index_entities()
+        return self._cleared_rooms
+
+    def status(self):
+        """ Number of rooms, of rooms with a living monster, with unclaimed treasure and of cleared rooms """
+        return {'rooms': len(self.rooms), 'live_monsters': len(self.live_monsters),
+                'unclaimed_treasure': len(self.unclaimed_treasure), 'cleared_rooms': len(self.cleared_rooms)}
+
+    @property
+    def entry_room(self):
+        """ Id of the ENTRY room, where the player enters the dungeon (0 if there is none, as in the default layout) """
+        if self._entry is None:
+            self._entry = 0
+            if self.store is not None:
+                from .store import ROOM_TYPE_CODES
+                codes = self.store.room_type
+                code = ROOM_TYPE_CODES['ENTRY']
+                if code in codes:
+                    self._entry = self.store.ids[codes.index(code)]
+            else:
+                for room in self.rooms:
+                    if room.room_type == 'ENTRY':
+                        self._entry = room.id
+                        break
+        return self._entry
+
+    def get_current_room(self):
+
+        # user has not entered the dungeon
+        if self.player_location == -1:
+            return None
+        return self.find_room(self.player_location)
+
+    def is_occupied(self, room_id):
+        """ True if a player stands in the room """
+        return room_id == self.player_location
+
+    def find_room(self, room):
+        """ Finds and returns the room with the room (accepts either int, str or room object)
+            Returns None if no room found (or the string is not a number)
+        """
+        if isinstance(room, int):
+            i = self.room_index.get(room)
+        elif isinstance(room, str):
+            try:
+                i = self.room_index.get(int(room))
+            except ValueError:
+                return None
+        else:
+            i = self.room_index.get(room.id)
+
+        if i is None:
+            return None
+        return self.rooms[i]
+
+    @property
+    def monster(self):
+        """ Gets the monster from the room that the player is in
+            Returns None if there is no monster in the room
+        """
+        room = self.get_current_room()
+        if room != None and room.has_monster:
+            return room.monster
+        return None
+
+    def next_rooms(self, current_room):
+        """ Accepts room object or room id to return rooms it is connected to 
+            Returns a list of rooms that the current room connects to
+        """
+        if isinstance(current_room, int):
+            return self.dungeon_map[current_room]
+
+        return self.dungeon_map[current_room.id]
+
+
+def link_arrays(room_links, room_index, n):
+    """ CSR arrays (offsets, targets) of the links between n rooms, by position (see Dungeon._link_rooms) """
+    counts = [0] * (n + 1)
+    pairs = []
+    for src, dst in room_links:
+        i = room_index.get(src)
+        j = room_index.get(dst)
+        if i is None or j is None or i == j:
+            continue
+        counts[i + 1] += 1
+        pairs.append((i, j))
+
+    # offsets are the running totals of the number of links of each room
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    offsets = array('q', counts)
+
+    targets = array('q', bytes(8 * len(pairs)))
+    fill = counts[:n]
+    for i, j in pairs:
+        targets[fill[i]] = j
+        fill[i] += 1
+    return offsets, targets
+
+
+class DungeonMap(Mapping):
+    """ Read-only view of the connections of a dungeon: room id -> list of connected rooms
+        The lists are built from the dungeon's CSR arrays the first time a room is looked up.
+    """
+    def __init__(self, dungeon):
+        self.dungeon = dungeon
+        self._connections = {}          # room id -> list of rooms, filled on demand
+
+    def __getitem__(self, room_id):
+        connected_rooms = self._connections.get(room_id)
+        if connected_rooms is None:
+            dg = self.dungeon
+            i = dg.room_index[room_id]
+            targets = dg.link_targets[dg.link_offsets[i]:dg.link_offsets[i + 1]]
+            connected_rooms = [dg.rooms[j] for j in targets]
+            self._connections[room_id] = connected_rooms
+        return connected_rooms
+
+    def __iter__(self):
+        return iter(self.dungeon.room_index)
+
+    def __len__(self):
+        return len(self.dungeon.room_index)
+
+class Room:
+    """ Represents one room. A room can have either monsters or treasure in it.
+        Whenever a room is created, there is a 75% chance that it will contain a monsther
+        and 25% treasure in it. It appropriately sets the room type to be either
+        "MONSTER" or "TREASURE"
+    """
+    __slots__ = ('id', 'room_type', 'monster', 'treasure', 'room_status', 'description', 'entry_door_desc',
+                 'has_monster', 'has_treasure')
+
+    def __init__(self, id, room_type, rng=None):
+        """ creates one room using the room type parameter
+            If room type is MURKY, randomly sets room to room type MONSTER or TREASURE
+        """
+        self.id = id
+        self.room_type = room_type      # room can be an entry, exit or murky (with monster or treasure)
+        self.monster = None             # reference to the monster
+        self.treasure = None            # reference to the treasure
+        self.room_status = None         # if room has been visited or needs to be initialized
+        self.description = ''           # colorful description of the room
+        self.entry_door_desc = ''       # colorful description of the door 
+        self.has_monster = False
+        self.has_treasure = False
+
+        if self.room_type == 'MURKY':
+            # will this room have a monster or treasure? Monsters are more likely
+            if rng is None:
+                rng = default_stream()
+            if rng.random() < 0.75:
+                self.room_type = 'MONSTER'
+            else:
+                self.room_type = 'TREASURE'
+
+class Treasure:
+    """ Simple object that has random agility and health rewards for the player
+    """
+    __slots__ = ('agility_reward', 'health_reward', 'empty')
+
+    def __init__(self, rng=None, agility_reward=None, health_reward=None):
+        """ Rewards that are not given are rolled """
+        if rng is None and (agility_reward is None or health_reward is None):
+            rng = default_stream()
+        self.agility_reward = rng.randint(2, 8) if agility_reward is None else agility_reward
+        self.health_reward = rng.randint(2, 8) if health_reward is None else health_reward
+        self.empty = False
+
+class Creature:
+    """ It represents any living thing in the dungeon. A creature can be a Monster or a Player.
+        It contains the attributes common to any creature: name, health, agility and if it is alive.
+    """
+    __slots__ = ('name', 'agility', 'health', 'is_alive')
+
+    def __init__(self, name, rng=None, agility=None, health=None):
+        """ Stats that are not given are rolled """
+        if rng is None and (agility is None or health is None):
+            rng = default_stream()
+        self.name = name
+        self.agility = rng.randint(2, 10) if agility is None else agility
+        self.health = rng.randint(2, 10) if health is None else health
+        self.is_alive = True
+
+    def __str__(self):
+        return f'Name:{self.name}, Type:{type(self)}, Alive:{self.is_alive}, Health:{self.health}, Agility:{self.agility}'
+
+class Player(Creature):
+    """ Player class that contains the player's location in the dungeon and stats on the player
+    """
+    __slots__ = ('runs_count', 'fights_count')
+
+    def __init__(self, name, rng=None, agility=None, health=None):
+        super().__init__(name, rng, agility, health)
+        self.runs_count = 0
+        self.fights_count = 0
+
+    def __str__(self):
+        s = super().__str__()
+        s += f', Runs count:{self.runs_count}, Fight count:{self.fights_count}'
+        return s
+
+class Monster(Creature):
+    """ Monster class that contains the monster's location in the dungeon.
+    """
+    __slots__ = ('current_room',)
+
+    def __init__(self, name, rng=None, agility=None, health=None):
+        super().__init__(name, rng, agility, health)
+        self.current_room = 1
+
+class BattleManager:
+    """ Controls all the fights that take place in the dungeon
+    """
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else default_stream()
+
+    def run(self, player, monster):
+        """ Executes the scenario where player runs away from the monster
+            If player is faster than the monster, it is an easy escape
+            If monster is same speed or faster than player, then player takes damage
+            Returns 0 if player escapes unharmed, returns 1 if player was harmed
+        """
+        # set the running odds
+        total_a = player.agility + monster.agility
+        player_odds = player.agility/total_a
+        monster_odds = monster.agility/total_a
+
+        # run!! (0 means player won, 1 means monster won)
+        i = 0 if self.rng.random() < player_odds else 1
+        player.runs_count += 1
+
+        # player won the race, no change to health or agility
+        if i == 1:
+            return GameController.PLAYER_RAN_UNHURT
+        # if monster won, player loses agility and health but escapes
+        else:
+            player.health -= 2
+            player.agility -= 2
+
+            if player.agility < 0:
+                player.agility = 0
+
+            if player.health <= 0:
+                player.health = 0
+                player.is_alive = False
+                return GameController.PLAYER_DIED
+
+        return GameController.PLAYER_RAN_HURT
+
+    def reward_player(self, player, dungeon):
+        """ Player's health and agility are incremented by the values in the reward in the room
+        """
+        # find the current room and get the reward stats and add to player stats
+        room = dungeon.get_current_room()
+        hrw = room.treasure.health_reward
+        arw = room.treasure.agility_reward
+        player.health += hrw
+        player.agility += arw
+        if player.health > 10:
+            player.health = 10
+        if player.agility > 10:
+            player.agility = 10
+
+        return GameController.PICK_UP_REWARD        
+
+    def fight(self, player, monster):
+        """ executes the battle and probabilities between player and monster
+            The loser loses 2 health points. If all health is lost, creature is marked dead with 0 health
+            Also increments the players fight count
+            Returns int 0 if player won, or int 1 if monster won
+        """
+        # set the fighting odds
+        total_h = player.health + monster.health
+        player_odds = player.health/total_h
+        monster_odds = monster.health/total_h
+
+        # fight!! (0 means player won, 1 means monster won)
+        i = 0 if self.rng.random() < player_odds else 1
+        player.fights_count += 1
+
+        # if monster won, player loses health
+        if i == GameController.MONSTER_WON:
+            if player.health > 2:
+                player.health -= 2
+            else:
+                player.health = 0
+                player.is_alive = False
+            return GameController.MONSTER_WON
+        # player won, monster loses health
+        else:
+            if monster.health > 2:
+                monster.health -= 2
+            else:
+                monster.health = 0
+                monster.is_alive = False
+            return GameController.PLAYER_WON
+
+class GameController:
+    """ Controls the flow of the game. It uses objects (such as the dungeon and the player) to determine
+        the next step in the game.
+    """
+    # These are outcomes of all the things the player can do and are used through the file to manage the game
+    PLAYER_WON = 0
+    MONSTER_WON = 1
+    ENTER_DUNGEON = 2
+    PICK_UP_REWARD = 3
+    ENTERED_ROOM = 4
+    PLAYER_RAN_HURT = 5
+    PLAYER_RAN_UNHURT = 6
+    PLAYER_DIED = 7
+
+    # name of each outcome, e.g. for logs and network clients
+    RESULT_NAMES = {PLAYER_WON: 'PLAYER_WON', MONSTER_WON: 'MONSTER_WON', ENTER_DUNGEON: 'ENTER_DUNGEON',
+                    PICK_UP_REWARD: 'PICK_UP_REWARD', ENTERED_ROOM: 'ENTERED_ROOM', PLAYER_RAN_HURT: 'PLAYER_RAN_HURT',
+                    PLAYER_RAN_UNHURT: 'PLAYER_RAN_UNHURT', PLAYER_DIED: 'PLAYER_DIED'}
+
+    # why check_input rejects a command (VALID_INPUT if it does not)
+    VALID_INPUT = 0
+    EMPTY_INPUT = 1
+    UNKNOWN_COMMAND = 2
+    MOVE_NOT_ALLOWED = 3        # a command of the game, but not one of the valid moves right now
+    NO_SUCH_ROOM = 4            # a room id that is not behind one of the doors of the room
+    INPUT_ERROR_NAMES = {VALID_INPUT: 'VALID_INPUT', EMPTY_INPUT: 'EMPTY_INPUT', UNKNOWN_COMMAND: 'UNKNOWN_COMMAND',
+                         MOVE_NOT_ALLOWED: 'MOVE_NOT_ALLOWED', NO_SUCH_ROOM: 'NO_SUCH_ROOM'}
+
+    # every command of the game besides room ids
+    COMMANDS = ('enter', 'fight', 'run', 'reward', 'escape', 'bye')
+
+    def __init__(self, dg):
+        self.dungeon = dg
+        self.bm = BattleManager(dg.rng)
+        self._options = None
+        self._options_key = None        # (player location, dungeon version) the options were built for
+
+    def is_game_running(self):
+        return self.dungeon.player.is_alive
+
+    def user_escaped(self, user_input):
+        if user_input == 'escape':
+            croom = self.dungeon.get_current_room()
+            if croom.room_type == 'EXIT':
+                return True
+        
+        return False
+
+    def update_game_state(self, result, user_input):
+        """ Called after user has input the next move
+            If fight was fought it will update the dungeon and possibly end the game if player died
+            If player made a choice to move to a room, it will update locations
+        """
+        if result == GameController.ENTER_DUNGEON:
+            # user has entered the dungeon, update to the ENTRY room
+            self.dungeon.player_location = self.dungeon.entry_room
+            return
+
+        elif result == GameController.PICK_UP_REWARD:
+            # remove the treasure and mark room as empty
+            room = self.dungeon.get_current_room()
+            room.has_treasure = False
+            room.treasure.empty =  True
+            room.treasure.health_reward = 0
+            room.treasure.agility_reward = 0
+            self.dungeon.room_changed(room.id)
+            return 
+        elif result == GameController.ENTERED_ROOM:
+            # get the room using user input
+            room = self.dungeon.find_room(user_input)
+            self.dungeon.player_location = room.id
+            return
+        elif result == GameController.PLAYER_WON:
+            # if player won the fight and monster is dead, then move player to the next room
+            room = self.dungeon.get_current_room()
+            
+            if room.monster.is_alive == False:
+                room.has_monster = False
+                room.monster.agility = 0
+                room.monster.health = 0
+                self.dungeon.room_cleared(room.id)
+            return
+        elif (result == GameController.PLAYER_RAN_HURT
+            or result == GameController.PLAYER_RAN_UNHURT):
+            # ran away, no action needed
+            return
+        elif result == GameController.PLAYER_DIED:
+            # no action needed
+            return
+
+
+    def execute_move(self, user_input):
+        """
+            Returns: 0 if player wins fight, 1 if monster wins fight, GameController.ENTER_DUNGEON if enter dungeon
+        """
+        user_input = user_input.lower()
+
+        if user_input == 'fight':
+            # returns GameController.MONSTER_WON if player wins fight
+            return self.bm.fight(self.dungeon.player, self.dungeon.monster)
+        elif user_input == 'run':
+            val = self.bm.run(self.dungeon.player, self.dungeon.monster)
+            if val == GameController.PLAYER_DIED:
+                return val
+
+            # user escaped and entered a room
+            croom = self.dungeon.get_current_room()
+            next_rooms = self.dungeon.next_rooms(croom)
+            room_id = next_rooms[0].id
+            self.update_game_state(GameController.ENTERED_ROOM, room_id)
+            return val
+
+        elif user_input == 'enter':
+            return GameController.ENTER_DUNGEON
+        elif user_input == 'reward':
+            return self.bm.reward_player(self.dungeon.player, self.dungeon)
+        elif user_input == 'escape':
+            # nothing to do
+            return None
+        else:
+            # user chose a room (id) to enter
+            room = self.dungeon.find_room(user_input)
+            if room != None:
+                # update the current location of the player
+                self.dungeon.player_location = room.id
+                return GameController.ENTERED_ROOM
+            return None
+
+    def next_move_options(self):
+        """ At any point the player can either pick up the reward, fight, run or move to the next room
+            Returns a list with lists of options that the player must choose between. Valid options are:
+            If a living monster is in the room then:
+                Fight
+                Run
+            If treasure is in the room:
+                Reward (i.e. pick up the treasure)
+            If there is no monster or treasure in the room then:
+                Move to rooms (can be one or multiple rooms ahead)
+            List with applicable options is returned.
+            [ [fight], [run], [reward], [enter], [move, room1 id, room2 id] ] 
+            The list is kept until the player moves or the dungeon changes (see Dungeon.room_changed),
+            do not modify it
+        """
+        dg = self.dungeon
+        key = (dg.player_location, dg.version)
+        if key != self._options_key:
+            self._options = self._move_options()
+            self._options_key = key
+        return self._options
+
+    def _move_options(self):
+        """ Builds the list returned by next_move_options """
+        room = self.dungeon.get_current_room()
+        connections = None
+        player_options = []
+        # user has not entered the dungeon
+        if room == None:
+            # user needs to enter dungeon
+            player_options = ["enter"]
+            return player_options
+
+        # if room has monster and monster is alive, option is fight or run
+        elif room.room_type == 'MONSTER':
+            if room.has_monster == True:
+                # either fight or run
+                player_options = ["fight", "run"]
+                return player_options
+            # if room has monster and monster is dead, select which room is next
+            elif room.has_monster == False:
+                player_options = ["move"]
+                connections = self.dungeon.next_rooms(room)
+                for r in connections:
+                    player_options.append(r.id)
+                return player_options
+        # if room has treasure, enjoy the reward
+        elif room.room_type == 'TREASURE':
+
+            # if treasure chest is empty (already been used)
+            if room.has_treasure == False:
+                player_options = ["move"]
+                connections = self.dungeon.next_rooms(room)
+                for r in connections:
+                    player_options.append(r.id)
+                return player_options
+
+            # pick up the reward
+            player_options = ["reward"]
+            return player_options
+        elif room.room_type == 'EXIT':
+            # say goodbye and you are a free person
+            player_options = ["escape"]
+            return player_options
+        elif room.room_type == 'ENTRY':
+            # you have only one choice, enter the scary dungeon
+            connections = self.dungeon.next_rooms(room)
+            player_options = ["move"]
+            for r in connections:
+                player_options.append(r.id)
+            return player_options
+        else:
+            # this option should never be reached, print warning
+            print(f'Error: unexpected room type found, {room.room_type}')
+            pass
+
+    def validate_input(self, valid_moves, x):
+        """ Compares user input """
+        from .display import Display
+
+        # take the input (the prompt goes through the renderer so it comes after any pending frame)
+        Display.out("Type your move: ", end='')
+        Display.renderer.flush()
+        x = input()
+        Display.renderer.new_page()
+        return GameController.check_move(valid_moves, x)
+
+    @staticmethod
+    def check_move(valid_moves, x):
+        """ Checks a move against the valid moves (the list returned by next_move_options)
+            Returns the move if it is valid (or 'bye'), 'badIO' otherwise
+        """
+        if GameController.check_input(valid_moves, x) == GameController.VALID_INPUT:
+            return x
+        return 'badIO'
+
+    @staticmethod
+    def check_input(valid_moves, x):
+        """ Same rules as check_move, but tells why a move is rejected
+            Returns GameController.VALID_INPUT if x is valid, otherwise one of the error codes
+            (EMPTY_INPUT, UNKNOWN_COMMAND, MOVE_NOT_ALLOWED, NO_SUCH_ROOM)
+        """
+        if x == 'bye':
+            return GameController.VALID_INPUT
+
+        if valid_moves[0] == 'move':
+            valid_moves = valid_moves[1:]
+        if x in valid_moves:
+            return GameController.VALID_INPUT
+        elif x.isdecimal():
+            # not isdigit: '²' is a digit but not a number int() can read
+            if int(x) in valid_moves:
+                return GameController.VALID_INPUT
+            return GameController.NO_SUCH_ROOM
+
+        if x == '':
+            return GameController.EMPTY_INPUT
+        elif x in GameController.COMMANDS:
+            return GameController.MOVE_NOT_ALLOWED
+        return GameController.UNKNOWN_COMMAND
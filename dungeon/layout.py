@@ -0,0 +1,268 @@
+""" Binary layout files: the rooms and links of a dungeon in a file that is opened through a memory map.
+    Nothing is parsed when a layout is opened: the sections of the file are used in place as typed
+    arrays, so opening a layout of a million rooms costs the same as opening one of six, and every
+    process that opens the same file shares its pages through the page cache (the map is read only).
+
+    File layout (little endian, every section starts on a 64 byte boundary):
+        header          magic, version, flags, number of rooms, number of links, size of the names
+                        and the offsets of the sections (see HEADER)
+        ids             int64 per room, in the order of the rooms
+        room types      int8 per room, code in store.ROOM_TYPES
+        name offsets    int64 per room + 1: the monster name of room i is names[offsets[i]:offsets[i + 1]]
+        names           utf8 monster names, one after the other
+        link offsets    int64 per room + 1 \\ the links by position, as Dungeon.link_offsets and
+        link targets    int64 per link     / Dungeon.link_targets (CSR arrays)
+
+    python -m dungeon.layout out.layout                     the default layout (Dungeon.init_rooms and room_links)
+    python -m dungeon.layout out.layout --edges edges.txt   from a text edge list (see read_edge_list)
+    python -m dungeon.layout --info out.layout
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .store import IdIndex, ROOM_TYPES, ROOM_TYPE_CODES
+
+MAGIC = b'DDAVELAY'
+VERSION = 1
+
+# magic, version, flags, number of rooms, number of links, size of the names,
+# offsets of the ids, room types, name offsets, names, link offsets and link targets
+HEADER = struct.Struct('<8sIIQQQ6Q')
+
+# alignment of the sections
+ALIGNMENT = 64
+
+# flags
+CONSECUTIVE_IDS = 1         # the room ids are first, first + 1, ... (no id index is needed)
+
+# types of the rooms of a layout: MURKY rooms become MONSTER or TREASURE rooms when the dungeon is populated
+LAYOUT_ROOM_TYPES = ('ENTRY', 'EXIT', 'MURKY')
+
+# rooms without a declared type in an edge list
+DEFAULT_MONSTER_NAME = 'Monster{}'
+
+
+class LayoutError(ValueError):
+    """ The file is not a layout file, or not one this version can read """
+
+
+class LayoutFile:
+    """ A layout file opened through a read-only memory map
+        ids, room_types, name_offsets, link_offsets and link_targets are memoryviews of the file
+        ('q' and 'b' arrays), names the bytes of the monster names. Keep the LayoutFile open as long as a
+        dungeon uses it; a LayoutFile sent to another process opens the file again (the map is shared).
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            # checked before mapping, an empty file cannot be mapped at all
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise LayoutError(f'{path} is not a layout file')
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.flags, n, n_links, names_size,
+         ids_at, types_at, name_offsets_at, names_at, link_offsets_at, link_targets_at) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise LayoutError(f'{path} is not a layout file')
+        if version != VERSION:
+            raise LayoutError(f'{path} is a layout file of version {version}, expected {VERSION}')
+        if link_targets_at + 8 * n_links > len(self._map):
+            raise LayoutError(f'{path} is truncated')
+
+        view = memoryview(self._map)
+        self.ids = view[ids_at:ids_at + 8 * n].cast('q')
+        self.room_types = view[types_at:types_at + n].cast('b')
+        self.name_offsets = view[name_offsets_at:name_offsets_at + 8 * (n + 1)].cast('q')
+        self.names = view[names_at:names_at + names_size]
+        self.link_offsets = view[link_offsets_at:link_offsets_at + 8 * (n + 1)].cast('q')
+        self.link_targets = view[link_targets_at:link_targets_at + 8 * n_links].cast('q')
+        self._index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __reduce__(self):
+        # other processes map the file themselves instead of receiving a copy of it
+        return LayoutFile, (self.path,)
+
+    @property
+    def index(self):
+        """ Room id -> position, built the first time it is asked for unless the ids are consecutive """
+        if self._index is None:
+            if self.flags & CONSECUTIVE_IDS:
+                self._index = IdIndex(self.ids[0] if len(self.ids) else 0, len(self.ids))
+            else:
+                self._index = {room_id: i for i, room_id in enumerate(self.ids)}
+        return self._index
+
+    def room_type(self, i):
+        """ Type of the room at position i """
+        return ROOM_TYPES[self.room_types[i]]
+
+    def monster_name(self, i):
+        """ Monster name of the room at position i ('' if it has none) """
+        return str(self.names[self.name_offsets[i]:self.name_offsets[i + 1]], 'utf8')
+
+    def init_rooms(self):
+        """ The rooms in the format of Dungeon.init_rooms: {id: type} or {id: (type, monster name)} """
+        murky = ROOM_TYPE_CODES['MURKY']
+        rooms = {}
+        for i, room_id in enumerate(self.ids):
+            code = self.room_types[i]
+            rooms[room_id] = ('MURKY', self.monster_name(i)) if code == murky else ROOM_TYPES[code]
+        return rooms
+
+    def links(self):
+        """ The links as (src, dst) room ids, in the format of Dungeon.room_links """
+        ids, offsets, targets = self.ids, self.link_offsets, self.link_targets
+        for i in range(len(ids)):
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                yield ids[i], ids[j]
+
+    def close(self):
+        """ Closes the map (fails with BufferError while a dungeon still uses the links of the file) """
+        for name in ('ids', 'room_types', 'name_offsets', 'names', 'link_offsets', 'link_targets'):
+            getattr(self, name).release()
+        self._map.close()
+
+
+def _padding(size):
+    return b'\0' * (-size % ALIGNMENT)
+
+
+def write_layout(path, rooms=None, links=None):
+    """ Writes a layout file from rooms and links in the format of Dungeon.init_rooms and Dungeon.room_links
+        (the defaults if not given); links to unknown rooms and links of a room to itself are left out
+        Rooms are 'ENTRY', 'EXIT' or ('MURKY', monster name), anything else raises ValueError
+        Returns the number of rooms and of links written
+    """
+    from .game import Dungeon, link_arrays
+    if rooms is None:
+        rooms = Dungeon.init_rooms
+    if links is None:
+        links = Dungeon.room_links
+
+    ids = array('q', rooms.keys())
+    room_types = array('b')
+    name_offsets = array('q', [0])
+    names = bytearray()
+    for room_id, v in rooms.items():
+        if isinstance(v, str) and v in ('ENTRY', 'EXIT'):
+            room_types.append(ROOM_TYPE_CODES[v])
+        elif not isinstance(v, str) and len(v) == 2 and v[0] == 'MURKY':
+            room_types.append(ROOM_TYPE_CODES['MURKY'])
+            names += v[1].encode()
+        else:
+            raise ValueError(f"room {room_id}: expected 'ENTRY', 'EXIT' or ('MURKY', monster name), got {v!r}")
+        name_offsets.append(len(names))
+    n = len(ids)
+    index = {room_id: i for i, room_id in enumerate(ids)}
+    link_offsets, link_targets = link_arrays(links, index, n)
+
+    flags = 0
+    if n > 0 and ids == array('q', range(ids[0], ids[0] + n)):
+        flags |= CONSECUTIVE_IDS
+
+    sections = [ids.tobytes(), room_types.tobytes(), name_offsets.tobytes(), bytes(names),
+                link_offsets.tobytes(), link_targets.tobytes()]
+    offsets = []
+    at = HEADER.size + len(_padding(HEADER.size))
+    for data in sections:
+        offsets.append(at)
+        at += len(data) + len(_padding(len(data)))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, n, len(link_targets), len(names), *offsets))
+        f.write(_padding(HEADER.size))
+        for data in sections:
+            f.write(data)
+            f.write(_padding(len(data)))
+    return n, len(link_targets)
+
+
+def read_edge_list(lines):
+    """ Reads a text edge list, returns (rooms, links) in the format of Dungeon.init_rooms and room_links
+        Every line is a link, a room or a comment:
+            3 4                 room 3 links to room 4
+            3 MURKY Beelzebub   room 3 is a MURKY room, its monster (if it gets one) is Beelzebub
+            0 ENTRY             room 0 is the ENTRY (and likewise EXIT)
+        Only ENTRY, EXIT and MURKY rooms can be declared (MURKY rooms become MONSTER or TREASURE rooms when
+        the dungeon is populated), and ENTRY and EXIT rooms have no monster name.
+            # ...               a comment (as are empty lines)
+        Rooms only named by links are MURKY rooms with a numbered monster; without an ENTRY or an EXIT
+        line the room with the lowest id is the ENTRY and the one with the highest id the EXIT.
+        The rooms are in the order of their ids, the links in the order of the lines.
+    """
+    declared = {}
+    links = []
+    for number, line in enumerate(lines, 1):
+        fields = line.split(None, 2)
+        if not fields or fields[0].startswith('#'):
+            continue
+        if len(fields) < 2:
+            raise ValueError(f'line {number}: expected "src dst" or "id TYPE [monster name]", got {line.strip()!r}')
+        if fields[1].lstrip('-').isdigit():
+            if len(fields) > 2 and not fields[2].lstrip().startswith('#'):
+                raise ValueError(f'line {number}: expected "src dst", got {line.strip()!r}')
+            links.append((int(fields[0]), int(fields[1])))
+        elif fields[1] in LAYOUT_ROOM_TYPES:
+            name = fields[2].strip() if len(fields) > 2 else ''
+            if name and fields[1] != 'MURKY':
+                raise ValueError(f'line {number}: {fields[1]} rooms have no monster, got {line.strip()!r}')
+            declared[int(fields[0])] = ('MURKY', name) if name else fields[1]
+        else:
+            raise ValueError(f'line {number}: room type {fields[1]!r} is not one of {", ".join(LAYOUT_ROOM_TYPES)}')
+
+    room_ids = set(declared)
+    for src, dst in links:
+        room_ids.add(src)
+        room_ids.add(dst)
+    room_ids = sorted(room_ids)
+    types = set(declared.values())
+    if room_ids and 'ENTRY' not in types:
+        declared.setdefault(room_ids[0], 'ENTRY')
+    if room_ids and 'EXIT' not in types:
+        declared.setdefault(room_ids[-1], 'EXIT')
+
+    rooms = {}
+    for room_id in room_ids:
+        v = declared.get(room_id)
+        if v is None or v == 'MURKY':
+            v = ('MURKY', DEFAULT_MONSTER_NAME.format(room_id))
+        rooms[room_id] = v
+    return rooms, links
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m dungeon.layout', description='Writes Dungeon Dave layout files')
+    parser.add_argument('path', help='layout file to write (or to describe with --info)')
+    parser.add_argument('--edges', help='text edge list to convert (- for stdin), the default layout if not given')
+    parser.add_argument('--info', action='store_true', help='describe the layout file instead of writing it')
+    args = parser.parse_args(argv)
+
+    if args.info:
+        layout = LayoutFile(args.path)
+        counts = {}
+        for code in layout.room_types:
+            counts[ROOM_TYPES[code]] = counts.get(ROOM_TYPES[code], 0) + 1
+        print(f'{args.path}: {len(layout)} rooms, {len(layout.link_targets)} links, '
+              + ', '.join(f'{name}={counts[name]}' for name in ROOM_TYPES if name in counts))
+        return 0
+
+    if args.edges is None:
+        rooms, links = None, None
+    elif args.edges == '-':
+        rooms, links = read_edge_list(sys.stdin)
+    else:
+        with open(args.edges) as f:
+            rooms, links = read_edge_list(f)
+    n, n_links = write_layout(args.path, rooms, links)
+    print(f'{args.path}: {n} rooms, {n_links} links')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
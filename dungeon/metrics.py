@@ -0,0 +1,232 @@
+""" Lightweight instrumentation of the game loop.
+    Timers (monotonic clock, nanoseconds) and counters per phase of the loop and per command,
+    latency histograms, values read from collectors at export time (e.g. the number of random
+    draws or art file reads), and an optional sampling profiler that can be started at any time.
+
+    Everything is off unless the DUNGEON_METRICS environment variable is set (to the file the metrics
+    are written to when the game ends, .prom for the Prometheus text format, JSON otherwise).
+    With metrics on, DUNGEON_PROFILE (a sampling interval in seconds) also starts the sampling profiler,
+    whose samples are part of the metrics (dungeon_profile_samples_total{stack="..."} in the Prometheus
+    format); on Unix the profiler is switched on and off with SIGUSR1.
+    When off, a timed phase costs one attribute check:
+
+        t = metrics.start()
+        ... phase ...
+        t = metrics.lap('execute_move', t)          # records the phase and starts the next one
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# upper bounds of the latency histogram buckets, in seconds (the last bucket has no bound)
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0, 60.0)
+_BUCKETS_NS = tuple(int(b * 1e9) for b in BUCKETS)
+
+# prefix of the metric names in the Prometheus text format
+PREFIX = 'dungeon_'
+
+
+class Histogram:
+    """ Latency histogram with the fixed BUCKETS """
+    __slots__ = ('counts', 'count', 'total_ns')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total_ns = 0
+
+    def observe(self, ns):
+        i = 0
+        while i < len(_BUCKETS_NS) and ns > _BUCKETS_NS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ns += ns
+
+    def to_dict(self):
+        return {'count': self.count, 'sum_seconds': self.total_ns / 1e9,
+                'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], self.counts))}
+
+
+class SamplingProfiler:
+    """ Samples the stack of one thread every interval seconds from a background thread
+        samples counts the stacks seen, as 'outer;inner;...' strings (the collapsed stack format of flame graphs)
+    """
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+
+class Metrics:
+    """ Registry of the counters and histograms; labels are tuples of (name, value) pairs """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}          # (name, labels) -> int
+        self.histograms = {}        # (name, labels) -> Histogram
+        self.collectors = []        # callables returning {name: value}, read at export time
+        self.profiler = None
+        self.samples = Counter()    # stacks sampled by the profilers that were stopped
+        self.started = time.time()
+
+    def start(self):
+        """ Returns the clock reading that starts a phase (0 when disabled) """
+        if self.enabled:
+            return time.perf_counter_ns()
+        return 0
+
+    def lap(self, phase, t):
+        """ Records the time since t as phase, and returns the clock reading that starts the next phase """
+        if not self.enabled:
+            return 0
+        now = time.perf_counter_ns()
+        self.observe('phase_seconds', now - t, (('phase', phase),))
+        return now
+
+    def observe(self, name, ns, labels=()):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        h = self.histograms.get(key)
+        if h is None:
+            h = self.histograms[key] = Histogram()
+        h.observe(ns)
+
+    def count(self, name, labels=(), n=1):
+        if self.enabled:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def start_profiler(self, interval=0.005):
+        """ Starts sampling the main thread (does nothing if the profiler is already running) """
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(interval)
+            self.profiler.start()
+
+    def stop_profiler(self):
+        """ Stops the profiler, its samples are added to self.samples """
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.samples.update(self.profiler.samples)
+            self.profiler = None
+
+    def toggle_profiler(self, interval=0.005):
+        if self.profiler is None:
+            self.start_profiler(interval)
+        else:
+            self.stop_profiler()
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+        self.samples = Counter()
+
+    def profile(self):
+        """ The stacks sampled so far, by the stopped profilers and the running one """
+        return self.samples + (self.profiler.samples if self.profiler is not None else Counter())
+
+    def snapshot(self):
+        """ All the metrics as a dict that can be dumped as JSON """
+        values = {}
+        for collector in self.collectors:
+            values.update(collector())
+
+        def flat(key):
+            name, labels = key
+            if not labels:
+                return name
+            return name + '{' + ','.join(f'{k}={v}' for k, v in labels) + '}'
+
+        snap = {
+            'time': time.time(),
+            'uptime_seconds': time.time() - self.started,
+            'counters': {flat(k): v for k, v in sorted(self.counters.items())},
+            'histograms': {flat(k): h.to_dict() for k, h in sorted(self.histograms.items())},
+            'values': values,
+        }
+        samples = self.profile()
+        if samples:
+            snap['profile'] = dict(samples.most_common())
+        return snap
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """ The metrics in the Prometheus text exposition format """
+        def labels_text(labels, extra=()):
+            pairs = [f'{k}="{v}"' for k, v in tuple(labels) + tuple(extra)]
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        lines = []
+        typed = set()
+        for (name, labels), v in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {PREFIX}{name} counter')
+                typed.add(name)
+            lines.append(f'{PREFIX}{name}{labels_text(labels)} {v}')
+
+        for (name, labels), h in sorted(self.histograms.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {PREFIX}{name} histogram')
+                typed.add(name)
+            cumulative = 0
+            for bound, n in zip([str(b) for b in BUCKETS] + ['+Inf'], h.counts):
+                cumulative += n
+                lines.append(f'{PREFIX}{name}_bucket{labels_text(labels, (("le", bound),))} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{labels_text(labels)} {h.total_ns / 1e9}')
+            lines.append(f'{PREFIX}{name}_count{labels_text(labels)} {h.count}')
+
+        for collector in self.collectors:
+            for name, v in sorted(collector().items()):
+                lines.append(f'# TYPE {PREFIX}{name} {"counter" if name.endswith("_total") else "gauge"}')
+                lines.append(f'{PREFIX}{name} {v}')
+
+        # one series per sampled stack, the stack (collapsed format) as a label
+        samples = self.profile()
+        if samples:
+            lines.append(f'# TYPE {PREFIX}profile_samples_total counter')
+            for stack, n in samples.most_common():
+                stack = stack.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                lines.append(f'{PREFIX}profile_samples_total{{stack="{stack}"}} {n}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """ Writes the metrics to path, in the Prometheus text format if it ends with .prom, as JSON otherwise """
+        text = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w') as f:
+            f.write(text)
+
+
+# the metrics of this process
+metrics = Metrics(enabled=bool(os.environ.get('DUNGEON_METRICS')))
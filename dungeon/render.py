@@ -0,0 +1,130 @@
+""" Buffered terminal output used by the Display.
+    Everything printed during a turn is composed into one frame and written with a single call.
+    Animation delays are handled by a timer instead of time.sleep, so the game loop never stalls.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+
+# ANSI escape sequences used in redraw mode
+CLEAR_SCREEN = '\x1b[2J\x1b[H'
+CLEAR_LINE = '\x1b[K'
+CLEAR_BELOW = '\x1b[J'
+
+
+class Renderer:
+    """ Collects the output of the Display into a frame buffer and writes whole frames to the terminal
+        In scroll mode (default) each frame is appended to the terminal, exactly like print() did.
+        In redraw mode frames are added to the current page, and each new_page() (e.g. once per turn)
+        replaces the page on the screen; only the lines that changed since the last redraw are rewritten.
+        Frames that must stay on screen for a while (animations, splash screens) hold back the
+        frames after them; those are written later by a timer thread, the caller never waits.
+    """
+    def __init__(self, stream=None, redraw=False):
+        self.stream = stream            # None means sys.stdout (looked up on every write)
+        self.redraw = redraw
+        self._buffer = []               # text written since the last flush
+        self._screen = None             # lines on screen (redraw mode)
+        self._page = ''                 # text of the page being shown (redraw mode)
+        self._page_break = False        # next frame starts a new page
+        self._queue = collections.deque()   # (due time, new page, frame) waiting to be written
+        self._free_at = 0.0             # time at which the next frame may be written
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def write(self, *args, sep=' ', end='\n'):
+        """ Adds text to the current frame, takes the same arguments as print() """
+        self._buffer.append(sep.join(str(a) for a in args) + end)
+
+    def flush(self):
+        """ Sends everything written since the last flush to the terminal as one frame """
+        if self._buffer:
+            frame = ''.join(self._buffer)
+            self._buffer = []
+            self._submit(frame, 0)
+
+    def new_page(self):
+        """ In redraw mode, the next frame replaces everything on the screen instead of being added to it """
+        self.flush()
+        self._page_break = True
+
+    def animate(self, frames, delay=1, repeats=1):
+        """ Shows each frame for delay seconds, without blocking the caller """
+        self.flush()
+        for i in range(0, repeats):
+            for frame in frames:
+                self._submit(frame + '\n', delay)
+
+    def close(self):
+        """ Flushes the buffer and waits until every pending frame has been written """
+        self.flush()
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+                wait = self._queue[0][0] - time.monotonic()
+            time.sleep(max(wait, 0.001))
+            self._pump()
+
+    def _submit(self, frame, hold):
+        """ Queues a frame, it is written as soon as the frames before it have been shown long enough """
+        with self._lock:
+            due = max(time.monotonic(), self._free_at)
+            self._queue.append((due, self._page_break, frame))
+            self._page_break = False
+            self._free_at = due + hold
+        self._pump()
+
+    def _pump(self, from_timer=False):
+        """ Writes every frame that is due, and sets a timer for the next one """
+        with self._lock:
+            if from_timer:
+                self._timer = None
+            now = time.monotonic()
+            frames = []
+            while self._queue and self._queue[0][0] <= now:
+                due, page_break, frame = self._queue.popleft()
+                if self.redraw and page_break:
+                    # a new page supersedes everything before it
+                    frames = []
+                    self._page = ''
+                frames.append(frame)
+
+            if frames:
+                if self.redraw:
+                    self._page += ''.join(frames)
+                    out = self._diff(self._page)
+                else:
+                    out = ''.join(frames)
+                stream = self.stream if self.stream is not None else sys.stdout
+                stream.write(out)
+                stream.flush()
+
+            if self._queue and self._timer is None:
+                self._timer = threading.Timer(self._queue[0][0] - now, self._pump, kwargs={'from_timer': True})
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _diff(self, page):
+        """ Returns the escape sequences and text that turn the page on screen into this one """
+        lines = page.split('\n')
+        if self._screen is None:
+            if os.name == 'nt':
+                os.system('')       # enables ANSI escape sequences in the Windows console
+            out = [CLEAR_SCREEN]
+            previous = []
+        else:
+            out = []
+            previous = self._screen
+
+        # the last line is always rewritten: it holds the prompt and whatever the user typed after it
+        last = len(lines) - 1
+        for row, line in enumerate(lines[:last]):
+            if row >= len(previous) - 1 or previous[row] != line:
+                out.append(f'\x1b[{row + 1};1H{line}{CLEAR_LINE}')
+        out.append(f'\x1b[{last + 1};1H{CLEAR_BELOW}{lines[last]}')
+
+        self._screen = lines
+        return ''.join(out)
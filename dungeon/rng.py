@@ -0,0 +1,109 @@
+""" Seeded random number service shared by the Room, Creature, Treasure and BattleManager objects.
+    Numbers are drawn from a numpy Generator in blocks and handed out one at a time, which is much
+    cheaper than one numpy call per draw and makes every game reproducible from a single seed.
+    numpy is imported when the first stream is created, not when this module is imported.
+    PythonStream has the same interface without numpy, for programs that only make a few draws.
+"""
+import random
+
+
+class RandomStream:
+    """ Buffered stream of random numbers backed by a numpy.random.Generator
+        The same seed always produces the same sequence of draws. Independent streams
+        (e.g. one per game) are created with spawn().
+    """
+    def __init__(self, seed=None, block=1024):
+        import numpy as np
+
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_seq = seed
+        else:
+            self.seed_seq = np.random.SeedSequence(seed)
+        self.generator = np.random.Generator(np.random.PCG64(self.seed_seq))
+        self.block = block
+        self._uniforms = []         # pre-drawn floats in [0, 1)
+        self._pos = 0               # next unused float in _uniforms
+        self._integers = {}         # (low, high) -> [pre-drawn ints, next unused int]
+        self._used = 0              # draws handed out from the blocks that were already replaced
+
+    def random(self):
+        """ Returns the next float in [0, 1) """
+        if self._pos == len(self._uniforms):
+            self._used += self._pos
+            self._uniforms = self.generator.random(self.block).tolist()
+            self._pos = 0
+        u = self._uniforms[self._pos]
+        self._pos += 1
+        return u
+
+    def randint(self, low, high):
+        """ Returns the next int in [low, high], both ends included (like random.randint) """
+        buf = self._integers.get((low, high))
+        if buf is None or buf[1] == len(buf[0]):
+            if buf is not None:
+                self._used += buf[1]
+            buf = [self.generator.integers(low, high + 1, self.block).tolist(), 0]
+            self._integers[(low, high)] = buf
+        i = buf[0][buf[1]]
+        buf[1] += 1
+        return i
+
+    def choice(self, seq):
+        """ Returns a random element of a non empty sequence """
+        return seq[self.randint(0, len(seq) - 1)]
+
+    def draws(self):
+        """ Returns the number of numbers handed out so far (counted per block, so draws cost nothing extra) """
+        return self._used + self._pos + sum(buf[1] for buf in self._integers.values())
+
+    def spawn(self, n=1):
+        """ Returns a list of n new streams that are independent of this one and of each other """
+        return [RandomStream(s, self.block) for s in self.seed_seq.spawn(n)]
+
+
+class PythonStream:
+    """ Stream of random numbers backed by the standard library's random.Random
+        Same draws interface as RandomStream, for programs that make a few dozen draws and should not pay
+        for importing numpy; numpy is only imported if generator is used (bulk and compact room creation)
+    """
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._draws = 0
+        self._generator = None
+
+    @property
+    def generator(self):
+        """ numpy Generator seeded from this stream the first time it is asked for, so the vectorized
+            draws of a seeded stream are reproducible as well
+        """
+        if self._generator is None:
+            import numpy as np
+            self._generator = np.random.Generator(np.random.PCG64(self._random.getrandbits(128)))
+        return self._generator
+
+    def random(self):
+        self._draws += 1
+        return self._random.random()
+
+    def randint(self, low, high):
+        self._draws += 1
+        return self._random.randint(low, high)
+
+    def choice(self, seq):
+        return seq[self.randint(0, len(seq) - 1)]
+
+    def draws(self):
+        return self._draws
+
+    def spawn(self, n=1):
+        return [PythonStream(self._random.getrandbits(64)) for _ in range(n)]
+
+
+_default_stream = None
+
+def default_stream():
+    """ Returns the (unseeded) stream used by objects that were not given one """
+    global _default_stream
+    if _default_stream is None:
+        _default_stream = RandomStream()
+    return _default_stream
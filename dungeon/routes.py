@@ -0,0 +1,234 @@
+""" Distances to the EXIT and shortest routes through a dungeon.
+    A RouteIndex runs one breadth first search backwards over the links, from every EXIT room at
+    once, and keeps the number of moves from each room to the nearest EXIT and the next room on such
+    a route in typed arrays, so looking them up costs the same on a dungeon of any size.
+    The index is updated in place when a room is cleared or blocked and when a link is added or
+    removed: only the rooms whose distance changes are visited again.
+"""
+import heapq
+from array import array
+from collections import OrderedDict
+
+UNREACHABLE = -1
+
+
+class RouteIndex:
+    """ Distances (in moves) from every room of a dungeon to the nearest EXIT
+        distance[i] and next_hop[i] are indexed by the position of the room in dungeon.rooms;
+        UNREACHABLE (-1) if no EXIT can be reached from the room
+        With avoid_monsters=True rooms with a living monster are never entered on a route (the room the
+        player stands in can still hold one), and dungeon.room_cleared / room_blocked keep that up to date
+    """
+    # number of targets whose distances are kept by distances_to (each costs 8 bytes per room)
+    MAX_TARGETS = 16
+
+    def __init__(self, dungeon, avoid_monsters=False):
+        self.dungeon = dungeon
+        self.avoid_monsters = avoid_monsters
+        n = len(dungeon.rooms)
+
+        # rooms a route may lead into, and the EXIT rooms
+        if dungeon.store is not None:
+            from .store import ROOM_TYPE_CODES
+            store = dungeon.store
+            exit_code = ROOM_TYPE_CODES['EXIT']
+            self.exits = [i for i, t in enumerate(store.room_type) if t == exit_code]
+            blocked = store.has_monster if avoid_monsters else bytes(n)
+        else:
+            rooms = dungeon.rooms
+            self.exits = [i for i, room in enumerate(rooms) if room.room_type == 'EXIT']
+            blocked = [room.has_monster for room in rooms] if avoid_monsters else bytes(n)
+        self.open = array('b', [0 if b else 1 for b in blocked])
+        for i in self.exits:
+            self.open[i] = 1
+
+        # the links backwards: room j -> positions of the rooms that link to it
+        offsets, targets = dungeon.link_offsets, dungeon.link_targets
+        self.sources = [[] for _ in range(n)]
+        for i in range(n):
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                self.sources[j].append(i)
+
+        self._targets = OrderedDict()   # room position -> distances to it, least recently used first (see distances_to)
+        self._build()
+
+    def _build(self):
+        n = len(self.dungeon.rooms)
+        self.distance = array('q', [UNREACHABLE]) * n
+        self.next_hop = array('q', [UNREACHABLE]) * n
+        for i in self.exits:
+            self.distance[i] = 0
+        self._search(list(self.exits))
+
+    def _search(self, frontier):
+        """ Breadth first search backwards from frontier (positions whose distance is final),
+            lowers the distance of every room it reaches through a shorter route
+        """
+        distance, next_hop, sources, is_open = self.distance, self.next_hop, self.sources, self.open
+        while frontier:
+            next_frontier = []
+            for j in frontier:
+                if not is_open[j]:
+                    continue
+                d = distance[j] + 1
+                for i in sources[j]:
+                    if distance[i] == UNREACHABLE or d < distance[i]:
+                        distance[i] = d
+                        next_hop[i] = j
+                        next_frontier.append(i)
+            frontier = next_frontier
+
+    def _successors(self, i):
+        dg = self.dungeon
+        return dg.link_targets[dg.link_offsets[i]:dg.link_offsets[i + 1]]
+
+    def _position(self, room_id):
+        i = self.dungeon.room_index.get(room_id)
+        if i is None:
+            raise KeyError(room_id)
+        return i
+
+    # lookups, by room id
+
+    def distance_to_exit(self, room_id):
+        """ Number of moves from the room to the nearest EXIT, None if no EXIT can be reached """
+        d = self.distance[self._position(room_id)]
+        return None if d == UNREACHABLE else d
+
+    def next_room(self, room_id):
+        """ Id of the next room on a shortest route to an EXIT, None if there is none (or the room is an EXIT) """
+        j = self.next_hop[self._position(room_id)]
+        return None if j == UNREACHABLE else self.dungeon.rooms[j].id
+
+    def can_escape(self, room_id):
+        return self.distance[self._position(room_id)] != UNREACHABLE
+
+    def route(self, room_id):
+        """ Ids of the rooms on a shortest route from the room to an EXIT (both included), [] if there is none """
+        i = self._position(room_id)
+        if self.distance[i] == UNREACHABLE:
+            return []
+        rooms = self.dungeon.rooms
+        route = [rooms[i].id]
+        while self.next_hop[i] != UNREACHABLE:
+            i = self.next_hop[i]
+            route.append(rooms[i].id)
+        return route
+
+    def distances_to(self, room_id):
+        """ Number of moves from every room to the room (by position in dungeon.rooms, UNREACHABLE if none)
+            Computed by a breadth first search the first time and kept until the dungeon changes; only the
+            MAX_TARGETS most recently asked for targets are kept
+        """
+        t = self._position(room_id)
+        distance = self._targets.get(t)
+        if distance is not None:
+            self._targets.move_to_end(t)
+        else:
+            distance = array('q', [UNREACHABLE]) * len(self.dungeon.rooms)
+            distance[t] = 0
+            sources, is_open = self.sources, self.open
+            frontier = [t]
+            while frontier:
+                next_frontier = []
+                for j in frontier:
+                    if not is_open[j] and j != t:
+                        continue
+                    d = distance[j] + 1
+                    for i in sources[j]:
+                        if distance[i] == UNREACHABLE:
+                            distance[i] = d
+                            next_frontier.append(i)
+                frontier = next_frontier
+            self._targets[t] = distance
+            if len(self._targets) > RouteIndex.MAX_TARGETS:
+                self._targets.popitem(last=False)
+        return distance
+
+    def distance_between(self, src, dst):
+        """ Number of moves from room src to room dst, None if dst cannot be reached """
+        d = self.distances_to(dst)[self._position(src)]
+        return None if d == UNREACHABLE else d
+
+    # updates
+
+    def room_cleared(self, room_id):
+        """ The room can be entered again (its monster died or left): routes through it may now be shorter
+            Nothing changes if the room holds a living monster again by the time this is called
+        """
+        j = self._position(room_id)
+        if not self.avoid_monsters or self.open[j] or self.dungeon.rooms[j].has_monster:
+            return
+        self.open[j] = 1
+        self._targets.clear()
+        if self.distance[j] != UNREACHABLE:
+            self._search([j])
+
+    def room_blocked(self, room_id):
+        """ The room can no longer be entered (a living monster moved in) """
+        j = self._position(room_id)
+        if not self.avoid_monsters or not self.open[j] or j in self.exits or not self.dungeon.rooms[j].has_monster:
+            return
+        self.open[j] = 0
+        self._targets.clear()
+        self._raise([i for i in self.sources[j] if self.next_hop[i] == j])
+
+    def link_added(self, src, dst):
+        """ Called after the dungeon's links gained src -> dst """
+        i, j = self._position(src), self._position(dst)
+        self.sources[j].append(i)
+        self._targets.clear()
+        if self.open[j] and self.distance[j] != UNREACHABLE:
+            d = self.distance[j] + 1
+            if self.distance[i] == UNREACHABLE or d < self.distance[i]:
+                self.distance[i] = d
+                self.next_hop[i] = j
+                self._search([i])
+
+    def link_removed(self, src, dst):
+        """ Called after the dungeon's links lost src -> dst """
+        i, j = self._position(src), self._position(dst)
+        self.sources[j].remove(i)
+        self._targets.clear()
+        if self.next_hop[i] == j:
+            self._raise([i])
+
+    def _raise(self, roots):
+        """ The routes of the rooms in roots lost their next hop: finds every room whose route went through
+            them, forgets their distances and searches again from the rooms around them that kept theirs
+        """
+        distance, next_hop, sources, is_open = self.distance, self.next_hop, self.sources, self.open
+
+        # the rooms whose shortest route goes through one of the roots
+        affected = set(roots)
+        stack = list(roots)
+        while stack:
+            j = stack.pop()
+            for i in sources[j]:
+                if next_hop[i] == j and i not in affected:
+                    affected.add(i)
+                    stack.append(i)
+        for i in affected:
+            distance[i] = UNREACHABLE
+            next_hop[i] = UNREACHABLE
+
+        # best route of every affected room through a room that is not affected, then Dijkstra inside the
+        # affected rooms (their starting distances differ, so a plain breadth first search is not enough)
+        heap = []
+        for i in affected:
+            for j in self._successors(i):
+                if is_open[j] and distance[j] != UNREACHABLE and (distance[i] == UNREACHABLE or distance[j] + 1 < distance[i]):
+                    distance[i] = distance[j] + 1
+                    next_hop[i] = j
+            if distance[i] != UNREACHABLE:
+                heap.append((distance[i], i))
+        heapq.heapify(heap)
+        while heap:
+            d, j = heapq.heappop(heap)
+            if d != distance[j] or not is_open[j]:
+                continue
+            for i in sources[j]:
+                if i in affected and (distance[i] == UNREACHABLE or d + 1 < distance[i]):
+                    distance[i] = d + 1
+                    next_hop[i] = j
+                    heapq.heappush(heap, (d + 1, i))
@@ -0,0 +1,175 @@
+""" Non-interactive driver: plays scripted sessions of commands, e.g. recorded games replayed as a load test.
+    Commands go through the same validation as the interactive game (GameController.check_input),
+    without prompts or retry messages: a rejected command is skipped and recorded with its error code,
+    and the session goes on with the next one, as a player typing again would.
+
+    Script format: one command per line, a line --- ends a session (so does the end of the input),
+    lines starting with # are comments. A blank line is a command too (EMPTY_INPUT).
+
+    python -m dungeon.script sessions.txt more.txt
+    cat sessions.txt | python -m dungeon.script --seed 1 --errors
+"""
+import argparse
+import sys
+import time
+
+from .game import Dungeon, GameController, Player
+from .rng import PythonStream
+
+# error code of a command that comes after the end of its game, besides the ones of GameController.check_input
+GAME_OVER = 5
+ERROR_NAMES = {**GameController.INPUT_ERROR_NAMES, GAME_OVER: 'GAME_OVER'}
+
+SEPARATOR = '---'
+
+
+class SessionReport:
+    """ What happened in one scripted session
+        outcome is 'escaped', 'died', 'quit' (bye) or 'unfinished' (the script ended first)
+        results are the results of the accepted commands, errors the (position, error code) of the rejected ones
+    """
+    def __init__(self, session):
+        self.session = session
+        self.outcome = 'unfinished'
+        self.results = []
+        self.errors = []
+        self.health = 0
+        self.agility = 0
+        self.location = None
+
+
+def split_sessions(lines):
+    """ Splits a stream of script lines (a file, sys.stdin, any iterable of strings) into sessions
+        Yields one list of commands per session
+    """
+    commands = []
+    for line in lines:
+        x = line.strip()
+        if x == SEPARATOR:
+            yield commands
+            commands = []
+        elif not x.startswith('#'):
+            commands.append(x)
+    if commands:
+        yield commands
+
+
+class ScriptDriver:
+    """ Plays scripted sessions back to back, each one a new game of the layout rooms and links
+        (Dungeon.init_rooms and Dungeon.room_links by default) drawing from its own stream spawned from rng
+    """
+    def __init__(self, rng=None, rooms=None, links=None, player_name='Dangerous Dave'):
+        self.rng = PythonStream() if rng is None else rng
+        self.rooms = rooms
+        self.links = links
+        self.player_name = player_name
+        self.sessions = 0
+
+    def play(self, commands):
+        """ Plays one session of commands (any iterable of strings), returns its SessionReport """
+        rng = self.rng.spawn()[0]
+        p = Player(self.player_name, rng)
+        dg = Dungeon(p, rng, self.rooms, self.links)
+        gc = GameController(dg)
+        report = SessionReport(self.sessions)
+        self.sessions += 1
+
+        check_input = GameController.check_input
+        results = report.results
+        errors = report.errors
+        options = gc.next_move_options()
+        running = True
+        for i, x in enumerate(commands):
+            if not running:
+                errors.append((i, GAME_OVER))
+                continue
+            error = check_input(options, x)
+            if error != GameController.VALID_INPUT:
+                errors.append((i, error))
+                continue
+            if x == 'bye':
+                report.outcome = 'quit'
+                running = False
+                continue
+
+            result = gc.execute_move(x)
+            gc.update_game_state(result, x)
+            results.append(result)
+            if gc.is_game_running() == False:
+                report.outcome = 'died'
+                running = False
+            elif gc.user_escaped(x) == True:
+                report.outcome = 'escaped'
+                running = False
+            else:
+                options = gc.next_move_options()
+
+        report.health = p.health
+        report.agility = p.agility
+        report.location = dg.player_location
+        return report
+
+    def play_all(self, sessions):
+        """ Plays every session of sessions (an iterable of iterables of commands), yields their reports """
+        for commands in sessions:
+            yield self.play(commands)
+
+
+def summarize(reports):
+    """ Totals of the reports: sessions, commands, outcomes and errors by name """
+    summary = {'sessions': 0, 'commands': 0, 'accepted': 0, 'outcomes': {}, 'errors': {}}
+    outcomes = summary['outcomes']
+    errors = summary['errors']
+    for report in reports:
+        summary['sessions'] += 1
+        summary['commands'] += len(report.results) + len(report.errors)
+        summary['accepted'] += len(report.results)
+        outcomes[report.outcome] = outcomes.get(report.outcome, 0) + 1
+        for _, code in report.errors:
+            errors[ERROR_NAMES[code]] = errors.get(ERROR_NAMES[code], 0) + 1
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m dungeon.script', description='Plays scripted Dungeon Dave sessions')
+    parser.add_argument('files', nargs='*', help='script files, stdin if none (or -)')
+    parser.add_argument('--seed', type=int, help='master seed of the sessions')
+    parser.add_argument('--errors', action='store_true', help='print every rejected command')
+    parser.add_argument('--strict', action='store_true', help='exit with status 1 if any command was rejected')
+    args = parser.parse_args(argv)
+
+    def lines():
+        for path in args.files or ['-']:
+            if path == '-':
+                yield from sys.stdin
+            else:
+                with open(path) as f:
+                    yield from f
+
+    driver = ScriptDriver(PythonStream(args.seed))
+    reports = driver.play_all(split_sessions(lines()))
+    if args.errors:
+        reports = _print_errors(reports)
+
+    start = time.perf_counter()
+    summary = summarize(reports)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print(f"{summary['sessions']} sessions, {summary['commands']} commands in {elapsed:.2f}s: "
+          f"{summary['sessions'] / elapsed:.0f} sessions/s, {summary['commands'] / elapsed:.0f} commands/s")
+    print('outcomes: ' + ', '.join(f'{k}={v}' for k, v in sorted(summary['outcomes'].items())))
+    print('rejected: ' + (', '.join(f'{k}={v}' for k, v in sorted(summary['errors'].items())) or 'none'))
+    if args.strict and summary['errors']:
+        return 1
+    return 0
+
+
+def _print_errors(reports):
+    for report in reports:
+        for position, code in report.errors:
+            print(f'session {report.session} command {position}: {code} {ERROR_NAMES[code]}')
+        yield report
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+""" One dungeon shared by many players, each playing from its own thread.
+    Every player has its own location, stats and random stream, and plays through a SharedController,
+    a GameController whose fights, runs and rewards change the room under the lock of that room only:
+    players in different rooms never wait for each other, and two players in the same room cannot both
+    kill its monster or both pick up its treasure. A command on a room that another player changed
+    in the meantime (the monster is dead, the treasure is gone) gets ROOM_CHANGED back and does nothing.
+
+    Rooms share a fixed number of locks (lock striping), so a dungeon of any size costs a few hundred locks.
+"""
+import threading
+
+from .game import Dungeon, GameController, Player
+
+
+class SharedDungeon(Dungeon):
+    """ A Dungeon without a player of its own: players join it with join() and play through SharedControllers
+        Changes to the entity sets, the version and the route indexes (rare: a monster dies, a treasure
+        is picked up) are serialized by one small lock, room state changes only take the lock of their room
+    """
+    def __init__(self, rng=None, rooms=None, links=None, bulk=False, compact=False, store=None, layout=None, locks=256):
+        super().__init__(None, rng, rooms, links, bulk=bulk, compact=compact, store=store, layout=layout)
+        self._room_locks = [threading.Lock() for _ in range(min(locks, max(1, len(self.rooms))))]
+        self._index_lock = threading.RLock()
+        self._join_lock = threading.Lock()
+        self.players = []
+        self._views = []
+
+    def room_lock(self, room_id):
+        """ The lock that guards the monster and the treasure of the room """
+        return self._room_locks[self.room_index[room_id] % len(self._room_locks)]
+
+    def join(self, name='Dangerous Dave', rng=None, location=-1):
+        """ Adds a player, returns its SharedController
+            The player draws from rng (a stream spawned from the dungeon's stream if not given, streams are
+            not thread safe) and starts outside the dungeon, or in room location
+        """
+        with self._join_lock:
+            if rng is None:
+                rng = self.rng.spawn()[0]
+            player = Player(name, rng)
+            view = PlayerView(self, player, rng)
+            view.player_location = location
+            self.players.append(player)
+            self._views.append(view)
+        return SharedController(view)
+
+    def is_occupied(self, room_id):
+        """ True if any of the players stands in the room (a scan of the players: only monster moves ask,
+            and the players' moves stay free of any lock)
+        """
+        return any(view.player_location == room_id for view in self._views)
+
+    def room_changed(self, room_id):
+        with self._index_lock:
+            super().room_changed(room_id)
+
+    def room_cleared(self, room_id):
+        with self._index_lock:
+            super().room_cleared(room_id)
+
+    def room_blocked(self, room_id):
+        with self._index_lock:
+            super().room_blocked(room_id)
+
+    def routes(self, avoid_monsters=False):
+        with self._index_lock:
+            return super().routes(avoid_monsters)
+
+    # the entity sets are built under the index lock: a room_changed that comes while they are built waits,
+    # and then updates the sets instead of being skipped and leaving them stale
+
+    def _build_entities(self):
+        with self._index_lock:
+            if self._cleared_rooms is None:
+                self._index_entities()
+
+    @property
+    def live_monsters(self):
+        if self._live_monsters is None:
+            self._build_entities()
+        return self._live_monsters
+
+    @property
+    def unclaimed_treasure(self):
+        if self._unclaimed_treasure is None:
+            self._build_entities()
+        return self._unclaimed_treasure
+
+    @property
+    def cleared_rooms(self):
+        if self._cleared_rooms is None:
+            self._build_entities()
+        return self._cleared_rooms
+
+    def add_link(self, src, dst):
+        with self._index_lock:
+            super().add_link(src, dst)
+
+    def remove_link(self, src, dst):
+        with self._index_lock:
+            super().remove_link(src, dst)
+
+
+class PlayerView:
+    """ The shared dungeon as seen by one player: its own player, location and stream,
+        everything else (rooms, links, entity sets, ...) is the shared dungeon's
+    """
+    def __init__(self, shared, player, rng):
+        self.shared = shared
+        self.player = player
+        self.rng = rng
+        self.player_location = -1
+
+    def __getattr__(self, name):
+        return getattr(self.shared, name)
+
+    get_current_room = Dungeon.get_current_room
+    monster = Dungeon.monster
+
+
+class SharedController(GameController):
+    """ GameController of one player of a SharedDungeon
+        fight, run and reward check and change the room under its lock, and the room part of
+        update_game_state (clearing a dead monster, emptying a treasure) is done in the same step
+        claims and kills are the ids of the rooms whose treasure this player picked up and whose monster it killed
+    """
+    # the room changed since the options were given (monster dead, treasure gone), nothing was done
+    ROOM_CHANGED = 8
+
+    RESULT_NAMES = {**GameController.RESULT_NAMES, ROOM_CHANGED: 'ROOM_CHANGED'}
+
+    # commands that read or change the monster or the treasure of the room
+    ROOM_COMMANDS = ('fight', 'run', 'reward')
+
+    def __init__(self, dg):
+        super().__init__(dg)
+        self.claims = []
+        self.kills = []
+        self._applied = None        # result whose room update execute_move already made
+
+    def execute_move(self, user_input):
+        x = user_input.lower()
+        self._applied = None
+        if x not in SharedController.ROOM_COMMANDS:
+            return super().execute_move(x)
+
+        room = self.dungeon.get_current_room()
+        with self.dungeon.shared.room_lock(room.id):
+            if x == 'reward':
+                if not room.has_treasure:
+                    return SharedController.ROOM_CHANGED
+            elif not room.has_monster:
+                return SharedController.ROOM_CHANGED
+
+            result = super().execute_move(x)
+            if result == GameController.PICK_UP_REWARD:
+                super().update_game_state(result, x)
+                self.claims.append(room.id)
+                self._applied = result
+            elif result == GameController.PLAYER_WON:
+                super().update_game_state(result, x)
+                if not room.has_monster:
+                    self.kills.append(room.id)
+                self._applied = result
+        return result
+
+    def update_game_state(self, result, user_input):
+        if result == SharedController.ROOM_CHANGED:
+            return
+        if result == self._applied:
+            # the room was already updated by execute_move
+            self._applied = None
+            return
+        super().update_game_state(result, user_input)
@@ -0,0 +1,282 @@
+""" Compact storage for the rooms, monsters and treasures of large dungeons.
+    Stats and flags are kept in typed arrays (a few bytes per room) and the rooms, monsters and
+    treasures are handed out as lightweight views that have the same attributes as Room, Monster
+    and Treasure, so the BattleManager and the GameController work with them unchanged.
+"""
+from array import array
+from collections.abc import Sequence
+
+# room types, as stored in EntityStore.room_type
+ROOM_TYPES = ('ENTRY', 'EXIT', 'MURKY', 'MONSTER', 'TREASURE')
+ROOM_TYPE_CODES = {name: code for code, name in enumerate(ROOM_TYPES)}
+
+
+def _zeros(typecode, n):
+    return array(typecode, bytes(array(typecode).itemsize * n))
+
+
+class IdIndex:
+    """ Room id -> position index for rooms whose ids are consecutive (first, first + 1, ...)
+        Behaves like the dict used by Dungeon.room_index, without storing anything per room
+    """
+    __slots__ = ('first', 'n')
+
+    def __init__(self, first, n):
+        self.first = first
+        self.n = n
+
+    def get(self, room_id, default=None):
+        i = room_id - self.first
+        if 0 <= i < self.n:
+            return i
+        return default
+
+    def __getitem__(self, room_id):
+        i = self.get(room_id)
+        if i is None:
+            raise KeyError(room_id)
+        return i
+
+    def __contains__(self, room_id):
+        return self.get(room_id) is not None
+
+    def __iter__(self):
+        return iter(range(self.first, self.first + self.n))
+
+    def __len__(self):
+        return self.n
+
+
+class EntityStore:
+    """ Keeps the state of n rooms (and their monster or treasure) in typed arrays
+        Rooms are addressed by position 0..n-1, room ids are kept in ids.
+        A room has a monster if monster_name is set, and a treasure if has_treasure_slot is set.
+    """
+    def __init__(self, ids):
+        n = len(ids)
+        self.ids = array('q', ids)
+        self.room_type = _zeros('b', n)
+        self.has_monster = _zeros('b', n)
+        self.has_treasure = _zeros('b', n)
+
+        self.monster_name = [None] * n
+        self.monster_agility = _zeros('b', n)
+        self.monster_health = _zeros('b', n)
+        self.monster_alive = _zeros('b', n)
+        self.monster_room = _zeros('q', n)
+
+        self.has_treasure_slot = _zeros('b', n)
+        self.agility_reward = _zeros('b', n)
+        self.health_reward = _zeros('b', n)
+        self.treasure_empty = _zeros('b', n)
+
+        self.extras = {}            # (position, attribute) -> value, for the rarely used room attributes
+
+        # rooms with consecutive ids (the usual case) need no index
+        if n > 0 and self.ids == array('q', range(self.ids[0], self.ids[0] + n)):
+            self.index = IdIndex(self.ids[0], n)
+        else:
+            self.index = {room_id: i for i, room_id in enumerate(self.ids)}
+
+        self.rooms = RoomSequence(self)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_monster(self, i, name, agility, health, is_alive=True):
+        self.monster_name[i] = name
+        self.monster_agility[i] = agility
+        self.monster_health[i] = health
+        self.monster_alive[i] = is_alive
+        self.monster_room[i] = self.ids[i]
+
+    def set_treasure(self, i, agility_reward, health_reward, empty=False):
+        self.has_treasure_slot[i] = 1
+        self.agility_reward[i] = agility_reward
+        self.health_reward[i] = health_reward
+        self.treasure_empty[i] = empty
+
+
+class RoomSequence(Sequence):
+    """ The rooms of a store, as a read-only list of RoomViews """
+    __slots__ = ('store',)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [RoomView(self.store, j) for j in range(*i.indices(len(self.store)))]
+        if i < 0:
+            i += len(self.store)
+        if not 0 <= i < len(self.store):
+            raise IndexError(i)
+        return RoomView(self.store, i)
+
+    def __len__(self):
+        return len(self.store)
+
+
+class _View:
+    """ Base of the views: a store and the position of the room in it """
+    __slots__ = ('_store', '_i')
+
+    def __init__(self, store, i):
+        self._store = store
+        self._i = i
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._store is other._store and self._i == other._i
+
+    def __hash__(self):
+        return hash((id(self._store), self._i))
+
+
+def _extra_property(name, default):
+    """ Property of a RoomView kept in the store's extras dict, only rooms where it was set use memory """
+    def getter(self):
+        return self._store.extras.get((self._i, name), default)
+
+    def setter(self, value):
+        self._store.extras[(self._i, name)] = value
+
+    return property(getter, setter)
+
+
+class RoomView(_View):
+    """ Room stored in an EntityStore, with the attributes of Room """
+    __slots__ = ()
+
+    @property
+    def id(self):
+        return self._store.ids[self._i]
+
+    @property
+    def room_type(self):
+        return ROOM_TYPES[self._store.room_type[self._i]]
+
+    @room_type.setter
+    def room_type(self, value):
+        self._store.room_type[self._i] = ROOM_TYPE_CODES[value]
+
+    @property
+    def has_monster(self):
+        return self._store.has_monster[self._i] == 1
+
+    @has_monster.setter
+    def has_monster(self, value):
+        self._store.has_monster[self._i] = value
+
+    @property
+    def has_treasure(self):
+        return self._store.has_treasure[self._i] == 1
+
+    @has_treasure.setter
+    def has_treasure(self, value):
+        self._store.has_treasure[self._i] = value
+
+    @property
+    def monster(self):
+        if self._store.monster_name[self._i] is None:
+            return None
+        return MonsterView(self._store, self._i)
+
+    @monster.setter
+    def monster(self, monster):
+        """ Copies the stats of the monster into the store (None removes the monster) """
+        if monster is None:
+            self._store.monster_name[self._i] = None
+        else:
+            self._store.set_monster(self._i, monster.name, monster.agility, monster.health, monster.is_alive)
+            self._store.monster_room[self._i] = monster.current_room
+
+    @property
+    def treasure(self):
+        if not self._store.has_treasure_slot[self._i]:
+            return None
+        return TreasureView(self._store, self._i)
+
+    @treasure.setter
+    def treasure(self, treasure):
+        """ Copies the rewards of the treasure into the store (None removes the treasure) """
+        if treasure is None:
+            self._store.has_treasure_slot[self._i] = 0
+        else:
+            self._store.set_treasure(self._i, treasure.agility_reward, treasure.health_reward, treasure.empty)
+
+    room_status = _extra_property('room_status', None)
+    description = _extra_property('description', '')
+    entry_door_desc = _extra_property('entry_door_desc', '')
+
+
+class MonsterView(_View):
+    """ Monster stored in an EntityStore, with the attributes of Monster """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self._store.monster_name[self._i]
+
+    @property
+    def agility(self):
+        return self._store.monster_agility[self._i]
+
+    @agility.setter
+    def agility(self, value):
+        self._store.monster_agility[self._i] = value
+
+    @property
+    def health(self):
+        return self._store.monster_health[self._i]
+
+    @health.setter
+    def health(self, value):
+        self._store.monster_health[self._i] = value
+
+    @property
+    def is_alive(self):
+        return self._store.monster_alive[self._i] == 1
+
+    @is_alive.setter
+    def is_alive(self, value):
+        self._store.monster_alive[self._i] = value
+
+    @property
+    def current_room(self):
+        return self._store.monster_room[self._i]
+
+    @current_room.setter
+    def current_room(self, value):
+        self._store.monster_room[self._i] = value
+
+    def __str__(self):
+        return f'Name:{self.name}, Type:{type(self)}, Alive:{self.is_alive}, Health:{self.health}, Agility:{self.agility}'
+
+
+class TreasureView(_View):
+    """ Treasure stored in an EntityStore, with the attributes of Treasure """
+    __slots__ = ()
+
+    @property
+    def agility_reward(self):
+        return self._store.agility_reward[self._i]
+
+    @agility_reward.setter
+    def agility_reward(self, value):
+        self._store.agility_reward[self._i] = value
+
+    @property
+    def health_reward(self):
+        return self._store.health_reward[self._i]
+
+    @health_reward.setter
+    def health_reward(self, value):
+        self._store.health_reward[self._i] = value
+
+    @property
+    def empty(self):
+        return self._store.treasure_empty[self._i] == 1
+
+    @empty.setter
+    def empty(self, value):
+        self._store.treasure_empty[self._i] = value
@@ -0,0 +1,172 @@
+""" Wandering monsters: a world clock that moves monsters from room to room along the links of a dungeon.
+    Every living monster has its next move scheduled some ticks ahead in a heap ordered by tick, so
+    advancing the clock only touches the monsters whose move is due: the cost of a tick depends on the
+    number of moves made in it, not on the number of monsters in the dungeon.
+
+    A monster only moves into a MONSTER room without a living monster (a room whose monster died or
+    left), never out of a room a player is in, and the rooms it leaves and enters are reported to
+    the dungeon (room_cleared, room_blocked), which keeps has_monster, the entity sets, the cached move
+    options and the route indexes consistent.
+"""
+import heapq
+import threading
+
+from .rng import default_stream
+
+
+class MonsterWorld:
+    """ Schedules and makes the moves of the living monsters of a dungeon
+        Every monster moves every min_period to max_period ticks (drawn from rng after each move), to a
+        random room linked to its room; with both_ways=True links are also followed backwards
+        The links are read when the world is created, create a new world after changing them
+    """
+    def __init__(self, dungeon, rng=None, min_period=1, max_period=10, both_ways=True):
+        self.dungeon = dungeon
+        self.rng = rng if rng is not None else default_stream()
+        self.min_period = min_period
+        self.max_period = max_period
+        self.tick = 0
+        self.moves = 0
+
+        # links by position, forwards and (optionally) backwards
+        n = len(dungeon.rooms)
+        offsets, targets = dungeon.link_offsets, dungeon.link_targets
+        self.neighbours = [list(targets[offsets[i]:offsets[i + 1]]) for i in range(n)]
+        if both_ways:
+            for i in range(n):
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    self.neighbours[j].append(i)
+
+        # flags of the room at a position, straight from the typed arrays of a compact dungeon
+        if dungeon.store is not None:
+            from .store import ROOM_TYPE_CODES
+            store = dungeon.store
+            monster_code = ROOM_TYPE_CODES['MONSTER']
+            self._has_monster = lambda j: store.has_monster[j] == 1
+            self._is_free = lambda j: store.room_type[j] == monster_code and not store.has_monster[j]
+        else:
+            rooms = dungeon.rooms
+            self._has_monster = lambda j: rooms[j].has_monster
+            self._is_free = lambda j: rooms[j].room_type == 'MONSTER' and not rooms[j].has_monster
+
+        # (due tick, sequence number, room position) of the next move of the monster in that room; an entry
+        # is only current if it holds the room's sequence number in _scheduled (older ones are dropped when due)
+        self._heap = []
+        self._scheduled = {}
+        self._sequence = 0
+        for room_id in dungeon.live_monsters:
+            self.dungeon.find_room(room_id).monster.current_room = room_id
+            self._heap.append(self._entry(dungeon.room_index[room_id], self.tick + self._period()))
+        heapq.heapify(self._heap)
+
+        # the rooms of a shared dungeon are changed under their locks (see shared.py)
+        self._room_lock = getattr(dungeon, 'room_lock', None)
+
+    def __len__(self):
+        """ Number of monsters whose next move is scheduled """
+        return len(self._scheduled)
+
+    def _period(self):
+        if self.min_period == self.max_period:
+            return self.min_period
+        return self.rng.randint(self.min_period, self.max_period)
+
+    def _entry(self, i, due):
+        self._sequence += 1
+        self._scheduled[i] = self._sequence
+        return (due, self._sequence, i)
+
+    def schedule(self, room_id, delay=None):
+        """ Schedules the next move of the monster in the room (e.g. a monster added after the world was
+            created) in delay ticks, or in a random period if not given; replaces its scheduled move
+        """
+        due = self.tick + (self._period() if delay is None else delay)
+        heapq.heappush(self._heap, self._entry(self.dungeon.room_index[room_id], due))
+
+    def advance(self, ticks=1):
+        """ Moves the clock ticks ahead and makes every move that is due, returns the number of moves made """
+        self.tick += ticks
+        heap, scheduled = self._heap, self._scheduled
+        moves = 0
+        while heap and heap[0][0] <= self.tick:
+            due, sequence, i = heapq.heappop(heap)
+            if scheduled.get(i) != sequence:
+                continue
+            del scheduled[i]
+            if not self._has_monster(i):
+                # the monster died since its move was scheduled
+                continue
+            j = self._move(i)
+            if j is not None:
+                moves += 1
+            heapq.heappush(heap, self._entry(i if j is None else j, due + self._period()))
+        self.moves += moves
+        return moves
+
+    def _move(self, i):
+        """ Moves the monster of the room at position i to a random free linked room,
+            returns the position of that room (None if the monster stayed)
+        """
+        is_free = self._is_free
+        free = [j for j in self.neighbours[i] if is_free(j)]
+        if not free:
+            return None
+        dg = self.dungeon
+        rooms = dg.rooms
+        room_id = rooms[i].id
+        if dg.is_occupied(room_id):
+            return None
+        j = free[0] if len(free) == 1 else self.rng.choice(free)
+
+        if self._room_lock is None:
+            moved = self._move_monster(rooms[i], rooms[j])
+        else:
+            # players only ever hold one room lock, so taking both here cannot deadlock
+            # (the two rooms may share a lock)
+            locks = list({self._room_lock(room_id), self._room_lock(rooms[j].id)})
+            for lock in locks:
+                lock.acquire()
+            try:
+                moved = self._move_monster(rooms[i], rooms[j])
+            finally:
+                for lock in locks:
+                    lock.release()
+        if not moved:
+            return None
+
+        dg.room_cleared(room_id)
+        dg.room_blocked(rooms[j].id)
+        return j
+
+    @staticmethod
+    def _move_monster(src, dst):
+        # checked again, under the locks of a shared dungeon a player may have killed it in the meantime
+        if not src.has_monster or dst.has_monster:
+            return False
+        dst.monster = src.monster
+        dst.has_monster = True
+        dst.monster.current_room = dst.id
+        src.monster = None
+        src.has_monster = False
+        return True
+
+
+class WorldClock:
+    """ Advances a MonsterWorld every interval seconds from a background thread, until stop() """
+    def __init__(self, world, interval=0.1):
+        self.world = world
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.world.advance()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
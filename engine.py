@@ -0,0 +1,103 @@
+""" Headless game engine used for balance testing.
+    Plays complete games through the GameController without the Display, input() or any sleep,
+    so nothing is printed and no art files are read.
+"""
+from collections import namedtuple
+
+from dungeon import Dungeon, GameController, Player
+from dungeon.rng import RandomStream
+
+# compact record of one finished game
+GameResult = namedtuple('GameResult', ['escaped', 'died', 'fights_count', 'runs_count',
+                                       'health', 'agility', 'final_room', 'moves'])
+
+
+def first_option_policy(options, controller):
+    """ Always picks the first option, i.e. fights every monster and takes the first door """
+    if options[0] == 'move':
+        return options[1]
+    return options[0]
+
+
+def run_policy(options, controller):
+    """ Runs from every monster, otherwise behaves like first_option_policy """
+    if 'run' in options:
+        return 'run'
+    return first_option_policy(options, controller)
+
+
+def random_policy(options, controller):
+    """ Picks any of the valid options at random, drawing from the game's own stream """
+    rng = controller.dungeon.rng
+    if options[0] == 'move':
+        return rng.choice(options[1:])
+    return rng.choice(options)
+
+
+# policies by name, e.g. for command lines and worker processes
+POLICIES = {'first': first_option_policy, 'run': run_policy, 'random': random_policy}
+
+
+class HeadlessEngine:
+    """ Drives GameController.next_move_options / execute_move / update_game_state from a move policy.
+        A policy is any callable policy(options, controller) that returns one of the options
+        (room ids may be returned either as int or str).
+        Every game draws from its own RandomStream spawned from the engine's seed, so a
+        sequence of games is reproducible from that single seed.
+        rooms and links select the dungeon layout (Dungeon.init_rooms and Dungeon.room_links by default).
+        The rooms and links are built once: every new game resets the same Dungeon (see Dungeon.reset), so a
+        controller returned by new_game is only good until the next new_game.
+    """
+    def __init__(self, policy=first_option_policy, seed=None, player_name='Dangerous Dave', max_moves=10000,
+                 rooms=None, links=None):
+        self.policy = policy
+        self.rooms = rooms
+        self.links = links
+        # a game only needs a few dozen draws, so the per-game streams refill in small blocks
+        self.rng = RandomStream(seed, block=64)
+        self.player_name = player_name
+        self.max_moves = max_moves      # safety net against policies that never finish a game
+        self.dungeon = None
+
+    def new_game(self):
+        """ Creates a fresh player and controller with a new independent stream, and rolls the dungeon again """
+        rng = self.rng.spawn()[0]
+        p = Player(self.player_name, rng)
+        if self.dungeon is None:
+            self.dungeon = Dungeon(p, rng, self.rooms, self.links)
+        else:
+            self.dungeon.reset(p, rng)
+        return GameController(self.dungeon)
+
+    def play(self, gc=None):
+        """ Plays one game to the end and returns its GameResult
+            The game ends when the player dies, escapes or max_moves is reached
+        """
+        if gc is None:
+            gc = self.new_game()
+        p = gc.dungeon.player
+
+        escaped = False
+        moves = 0
+        while moves < self.max_moves:
+            next_moves = gc.next_move_options()
+            x = str(self.policy(next_moves, gc))
+            moves += 1
+
+            result = gc.execute_move(x)
+            gc.update_game_state(result, x)
+
+            if gc.is_game_running() == False:
+                break
+
+            if gc.user_escaped(x) == True:
+                escaped = True
+                break
+
+        return GameResult(escaped, not p.is_alive, p.fights_count, p.runs_count,
+                          p.health, p.agility, gc.dungeon.player_location, moves)
+
+    def play_many(self, n):
+        """ Plays n games and yields the GameResult of each one """
+        for _ in range(n):
+            yield self.play()
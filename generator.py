@@ -0,0 +1,202 @@
+""" Procedural generator for large dungeons.
+    The dungeon is made of depth layers of width rooms each, between the ENTRY and the EXIT room.
+    Rooms are grouped in chunks of a few layers, and a chunk (its links, rooms, monsters and treasures)
+    is only generated when the player first reaches it, so memory grows with the explored area only.
+"""
+import numpy as np
+
+from dungeon import Dungeon, DungeonMap, Room
+from dungeon.rng import RandomStream, default_stream
+
+# monster names are picked from this list (and numbered by room)
+MONSTER_NAMES = ('Beelzebub', 'Gobblezebub', 'Devilzebub', 'Beetlejuice')
+
+# spawn key of the stream that generates the links of the ENTRY room
+ENTRY_CHUNK = -1
+
+
+class DungeonGenerator:
+    """ Describes a generated dungeon: its shape and the seed it is generated from
+        Room ids: ENTRY is 0, the room at position x of layer k is 1 + k * width + x, EXIT is the last id.
+        Every room links to the room at the same position of the next layer (the rooms of the last layer
+        link to EXIT), so every room leads to the EXIT and the ENTRY -> EXIT path is guaranteed.
+        branching    -- number of links of a room to rooms of the next layer
+        loop_density -- chance that a room also links to its neighbour in the same layer
+        Rooms only link forward (next layer or next position), so a game always ends.
+    """
+    def __init__(self, seed=None, depth=100, width=100, branching=2, loop_density=0.1, chunk_layers=8):
+        if depth < 1 or width < 1 or branching < 1 or chunk_layers < 1:
+            raise ValueError('depth, width, branching and chunk_layers must be at least 1')
+        self.seed_seq = np.random.SeedSequence(seed)
+        self.depth = depth
+        self.width = width
+        self.branching = min(branching, width)
+        self.loop_density = loop_density
+        self.chunk_layers = chunk_layers
+
+    @property
+    def n_rooms(self):
+        return self.depth * self.width + 2
+
+    @property
+    def n_chunks(self):
+        return (self.depth + self.chunk_layers - 1) // self.chunk_layers
+
+    @property
+    def exit_id(self):
+        return self.depth * self.width + 1
+
+    def chunk_of(self, room_id):
+        """ Returns the chunk a room belongs to, ENTRY_CHUNK for the ENTRY and EXIT rooms """
+        if room_id <= 0 or room_id >= self.exit_id:
+            return ENTRY_CHUNK
+        return (room_id - 1) // self.width // self.chunk_layers
+
+    def chunk_rooms(self, chunk):
+        """ Returns the range of room ids in a chunk """
+        first_layer = chunk * self.chunk_layers
+        last_layer = min(first_layer + self.chunk_layers, self.depth)
+        return range(1 + first_layer * self.width, 1 + last_layer * self.width)
+
+    def stream(self, chunk):
+        """ Returns the random stream of a chunk, it only depends on the seed and the chunk number """
+        seq = np.random.SeedSequence(self.seed_seq.entropy, spawn_key=(chunk + 1,))
+        return RandomStream(seq, block=4 * self.chunk_layers * self.width)
+
+    def entry_links(self):
+        """ Returns the ids of the rooms the ENTRY links to, the first one is always position 0 of layer 0 """
+        rng = self.stream(ENTRY_CHUNK)
+        links = [1]
+        for _ in range(self.branching - 1):
+            room_id = 1 + rng.randint(0, self.width - 1)
+            if room_id not in links:
+                links.append(room_id)
+        return links
+
+    def room_links(self, room_id, rng):
+        """ Returns the ids of the rooms a room links to, drawing the random links from rng """
+        layer, x = divmod(room_id - 1, self.width)
+        if layer == self.depth - 1:
+            links = [self.exit_id]
+        else:
+            next_layer = 1 + (layer + 1) * self.width
+            links = [next_layer + x]
+            for _ in range(self.branching - 1):
+                target = next_layer + rng.randint(0, self.width - 1)
+                if target not in links:
+                    links.append(target)
+
+        if x + 1 < self.width and rng.random() < self.loop_density:
+            links.append(room_id + 1)
+        return links
+
+    def monster_name(self, room_id):
+        return f'{MONSTER_NAMES[room_id % len(MONSTER_NAMES)]} {room_id}'
+
+    def layout(self):
+        """ Returns the whole dungeon as (init_rooms, room_links), in the format of Dungeon.init_rooms and
+            Dungeon.room_links. Only meant for small dungeons, a LazyDungeon never needs it
+        """
+        init_rooms = {0: 'ENTRY'}
+        room_links = [(0, j) for j in self.entry_links()]
+        for chunk in range(self.n_chunks):
+            rng = self.stream(chunk)
+            for room_id in self.chunk_rooms(chunk):
+                init_rooms[room_id] = ('MURKY', self.monster_name(room_id))
+                room_links.extend((room_id, j) for j in self.room_links(room_id, rng))
+        init_rooms[self.exit_id] = 'EXIT'
+        return init_rooms, tuple(room_links)
+
+
+class LazyDungeon(Dungeon):
+    """ Dungeon built by a DungeonGenerator, one chunk at a time
+        A chunk is generated the first time one of its rooms is looked up, i.e. when the player
+        reaches it (or reaches a room connected to it).
+        Rooms, monsters and treasures of a chunk are drawn from the chunk's own stream, so the
+        dungeon only depends on the generator's seed, not on the order in which it is explored.
+    """
+    def __init__(self, player, generator, rng=None):
+        self.player_location = -1
+        self.player = player
+        self.rng = rng if rng is not None else default_stream()    # used by the BattleManager
+        self.room_connections = None
+        self.rooms = []                 # materialized rooms, in the order they were created
+        self.room_index = {}            # room id -> position of the room in self.rooms
+        self.generator = generator
+        self.links = {}                 # room id -> ids of the rooms it links to (materialized rooms only)
+        self.chunks = set()             # chunks that have been generated
+        self.dungeon_map = LazyDungeonMap(self)
+        self._init_indexes()
+
+        # the ENTRY and EXIT rooms always exist
+        self._add_room(Room(0, 'ENTRY'), generator.entry_links())
+        self._add_room(Room(generator.exit_id, 'EXIT'), [])
+        self.chunks.add(ENTRY_CHUNK)
+
+    def _add_room(self, room, links):
+        self.room_index[room.id] = len(self.rooms)
+        self.rooms.append(room)
+        self.links[room.id] = links
+
+    def materialize(self, chunk):
+        """ Generates the links, rooms, monsters and treasures of a chunk """
+        if chunk in self.chunks:
+            return
+        gen = self.generator
+        rng = gen.stream(chunk)
+        room_ids = gen.chunk_rooms(chunk)
+        for room_id in room_ids:
+            self.links[room_id] = gen.room_links(room_id, rng)
+
+        # all the rooms of the chunk are populated at once
+        first = len(self.rooms)
+        self._create_rooms_bulk({room_id: ('MURKY', gen.monster_name(room_id)) for room_id in room_ids}, rng)
+        for room in self.rooms[first:]:
+            if room.monster != None:
+                room.monster.current_room = room.id
+        self.chunks.add(chunk)
+
+        # entity sets that were already built also hold the new rooms
+        if self._live_monsters is not None:
+            for room in self.rooms[first:]:
+                if room.has_monster:
+                    self._live_monsters.add(room.id)
+                if room.has_treasure:
+                    self._unclaimed_treasure.add(room.id)
+
+    def find_room(self, room):
+        """ Finds and returns the room (accepts either int, str or room object), generating its chunk if needed
+            Returns None if no room found (or the string is not a number)
+        """
+        if isinstance(room, str):
+            try:
+                room = int(room)
+            except ValueError:
+                return None
+        elif not isinstance(room, int):
+            room = room.id
+
+        if room not in self.room_index:
+            if room < 0 or room >= self.generator.n_rooms:
+                return None
+            self.materialize(self.generator.chunk_of(room))
+        return self.rooms[self.room_index[room]]
+
+
+class LazyDungeonMap(DungeonMap):
+    """ Connections of a LazyDungeon: room id -> list of connected rooms, generating chunks on demand """
+    def __getitem__(self, room_id):
+        connected_rooms = self._connections.get(room_id)
+        if connected_rooms is None:
+            dg = self.dungeon
+            if dg.find_room(room_id) is None:
+                raise KeyError(room_id)
+            connected_rooms = [dg.find_room(j) for j in dg.links[room_id]]
+            self._connections[room_id] = connected_rooms
+        return connected_rooms
+
+    def __iter__(self):
+        return iter(range(self.dungeon.generator.n_rooms))
+
+    def __len__(self):
+        return self.dungeon.generator.n_rooms
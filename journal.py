@@ -0,0 +1,301 @@
+""" Append-only journal of games, and their replay.
+    Every game written to a journal records the random draws it makes and every command given to
+    GameController.execute_move with its result. Replaying the journal feeds the recorded draws back
+    into a fresh game, which rebuilds the game at any step and checks every recorded result.
+
+    File layout (little endian):
+        header      magic, version, size of the layout (see HEADER)
+        layout      utf8 JSON, as in snapshot files
+        records     fixed-size RECORD_DTYPE records, from the first byte after the layout padded to 16 bytes
+
+    Records of one game (games are interleaved in the file):
+        BEGIN                                   a new game, its player and dungeon are created next
+        RANDOM / RANDINT ...                    the draws made while creating them
+        READY                                   the game is created
+        COMMAND code (value = room id)          a command given to execute_move (UNKNOWN if it is neither a
+                                                command nor a room number)
+        RANDOM / RANDINT ...                    the draws made while executing it
+        RESULT code                             its result (GameController.PLAYER_WON, ..., NO_RESULT for None)
+    Draws outside of these (e.g. made by a bot that picks its moves from the game's stream) are
+    recorded but not fed back, the commands they led to are.
+"""
+import os
+import struct
+
+import numpy as np
+
+from dungeon import Dungeon, GameController, Player
+from snapshot import encode_layout, decode_layout
+
+MAGIC = b'DDAVEJNL'
+VERSION = 1
+
+# magic, version, size of the layout
+HEADER = struct.Struct('<8sIQ')
+
+# kind, code, session, value (an int or the bits of a float)
+RECORD_DTYPE = np.dtype([('kind', 'u1'), ('code', 'u1'), ('pad', 'V2'), ('session', '<u4'), ('value', '<i8')])
+INT_RECORD = struct.Struct('<BBxxIq')
+FLOAT_RECORD = struct.Struct('<BBxxId')
+
+# kinds of records
+BEGIN = 1
+READY = 2
+RANDOM = 3
+RANDINT = 4
+COMMAND = 5
+RESULT = 6
+
+# command codes, room ids are MOVE with the id as value, anything else is UNKNOWN
+COMMAND_CODES = {'enter': 1, 'fight': 2, 'run': 3, 'reward': 4, 'escape': 5}
+MOVE = 6
+UNKNOWN = 7
+COMMAND_NAMES = {code: name for name, code in COMMAND_CODES.items()}
+
+# replayed for the UNKNOWN commands (the journal does not keep their text)
+UNKNOWN_INPUT = '?'
+
+# result of a command whose RESULT record was never written
+MISSING = object()
+
+# result code of the commands for which execute_move returns None (escape)
+NO_RESULT = 255
+
+
+class ReplayError(ValueError):
+    """ The journal does not match what the game does when it is replayed """
+
+
+class Journal:
+    """ Writer of a journal file; a new file gets the header of the layout rooms and links
+        (Dungeon.init_rooms and Dungeon.room_links by default), an existing file is appended to
+        Records are buffered and written every flush_every records, by flush() and by close()
+    """
+    def __init__(self, path, rooms=None, links=None, player_name='Dangerous Dave', flush_every=4096):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = []
+        self.next_session = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            reader = JournalReader(path)
+            self.rooms, self.links, self.player_name = reader.rooms, reader.links, reader.player_name
+            if len(reader.records):
+                self.next_session = int(reader.records['session'].max()) + 1
+            self.file = open(path, 'ab')
+            # drop a record that was only partly written when the writer stopped
+            self.file.truncate(reader.offset + len(reader.records) * RECORD_DTYPE.itemsize)
+        else:
+            self.rooms = Dungeon.init_rooms if rooms is None else rooms
+            self.links = Dungeon.room_links if links is None else links
+            self.player_name = player_name
+            layout = encode_layout(self.rooms, self.links, self.player_name)
+            self.file = open(path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION, len(layout)) + layout)
+            self.file.write(bytes(-(HEADER.size + len(layout)) % RECORD_DTYPE.itemsize))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, kind, code, session, value=0):
+        self._buffer.append(INT_RECORD.pack(kind, code, session, value))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def write_float(self, kind, session, value):
+        self._buffer.append(FLOAT_RECORD.pack(kind, 0, session, value))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.file.write(b''.join(self._buffer))
+        self.file.flush()
+        self._buffer = []
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def new_game(self, rng):
+        """ Creates a game of the journal's layout whose draws (from rng) and moves are recorded
+            Returns a JournaledController, its session id is gc.session
+        """
+        session = self.next_session
+        self.next_session += 1
+        self.write(BEGIN, 0, session)
+        stream = RecordingStream(rng, self, session)
+        p = Player(self.player_name, stream)
+        dg = Dungeon(p, stream, self.rooms, self.links)
+        self.write(READY, 0, session)
+        return JournaledController(dg, self, session)
+
+
+class RecordingStream:
+    """ Hands out the draws of a RandomStream and writes each one to a journal """
+    def __init__(self, stream, journal, session):
+        self.stream = stream
+        self.journal = journal
+        self.session = session
+
+    def random(self):
+        u = self.stream.random()
+        self.journal.write_float(RANDOM, self.session, u)
+        return u
+
+    def randint(self, low, high):
+        i = self.stream.randint(low, high)
+        self.journal.write(RANDINT, 0, self.session, i)
+        return i
+
+    def choice(self, seq):
+        return seq[self.randint(0, len(seq) - 1)]
+
+
+class JournaledController(GameController):
+    """ GameController that writes every command given to execute_move and its result to a journal """
+    def __init__(self, dg, journal, session):
+        super().__init__(dg)
+        self.journal = journal
+        self.session = session
+
+    def execute_move(self, user_input):
+        x = user_input.lower()
+        code = COMMAND_CODES.get(x)
+        if code is not None:
+            self.journal.write(COMMAND, code, self.session)
+        elif x.isdecimal():
+            self.journal.write(COMMAND, MOVE, self.session, int(x))
+        else:
+            # neither a command nor a room: execute_move does nothing with it, whatever it is
+            self.journal.write(COMMAND, UNKNOWN, self.session)
+        result = super().execute_move(user_input)
+        self.journal.write(RESULT, NO_RESULT if result is None else result, self.session)
+        return result
+
+
+class ReplayStream:
+    """ Hands out recorded draws, in order; draws is a list of (kind, value) """
+    def __init__(self, draws):
+        self.draws = draws
+        self.pos = 0
+
+    def _next(self, kind):
+        if self.pos == len(self.draws):
+            raise ReplayError('the game made more draws than the journal recorded')
+        draw_kind, value = self.draws[self.pos]
+        if draw_kind != kind:
+            raise ReplayError(f'draw {self.pos} was recorded as kind {draw_kind}, replayed as kind {kind}')
+        self.pos += 1
+        return value
+
+    def random(self):
+        return self._next(RANDOM)
+
+    def randint(self, low, high):
+        return self._next(RANDINT)
+
+    def choice(self, seq):
+        return seq[self.randint(0, len(seq) - 1)]
+
+
+class JournalReader:
+    """ A journal file opened through a memory map, records is the array of records """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, layout_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a journal')
+            if version != VERSION:
+                raise ValueError(f'{path} is a version {version} journal, expected version {VERSION}')
+            self.rooms, self.links, self.player_name = decode_layout(f.read(layout_size))
+
+        self.offset = -(-(HEADER.size + layout_size) // RECORD_DTYPE.itemsize) * RECORD_DTYPE.itemsize
+        n = (os.path.getsize(path) - self.offset) // RECORD_DTYPE.itemsize
+        if n > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=self.offset, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._games = None
+
+    def _load(self):
+        """ Reads the records once into lists (much faster to walk than the array) and groups them by game """
+        sessions = self.records['session']
+        order = np.argsort(sessions, kind='stable')
+        ids, starts = np.unique(sessions[order], return_index=True)
+        self._games = {s: positions.tolist() for s, positions in zip(ids.tolist(), np.split(order, starts[1:]))}
+        self._kinds = self.records['kind'].tolist()
+        self._codes = self.records['code'].tolist()
+        self._values = self.records['value'].tolist()
+        self._floats = self.records['value'].view('<f8').tolist()
+
+    def games(self):
+        """ Returns {session: positions of its records} """
+        if self._games is None:
+            self._load()
+        return self._games
+
+    def events(self, session):
+        """ The records of one game as (kind, code, value) tuples, draws with their float value """
+        positions = self.games()[session]
+        return [(self._kinds[i], self._codes[i], self._floats[i] if self._kinds[i] == RANDOM else self._values[i])
+                for i in positions]
+
+    def replay(self, session, step=None):
+        """ Rebuilds game session after its first step commands (all of them by default)
+            Every replayed result is checked against the recorded one (ReplayError if they differ)
+            Returns the GameController of the rebuilt game
+        """
+        positions = self.games()[session]
+        kinds, codes, values, floats = self._kinds, self._codes, self._values, self._floats
+
+        # the draws that the game made itself: while being created and while executing commands
+        draws = []
+        commands = []           # [command, result code], the code is missing if the command did not finish
+        inside = False
+        for i in positions:
+            kind = kinds[i]
+            if kind == RANDOM:
+                if inside:
+                    draws.append((RANDOM, floats[i]))
+            elif kind == RANDINT:
+                if inside:
+                    draws.append((RANDINT, values[i]))
+            elif kind == COMMAND:
+                inside = True
+                code = codes[i]
+                x = str(values[i]) if code == MOVE else UNKNOWN_INPUT if code == UNKNOWN else COMMAND_NAMES[code]
+                commands.append([x, MISSING])
+            elif kind == RESULT:
+                inside = False
+                commands[-1][1] = None if codes[i] == NO_RESULT else codes[i]
+            else:
+                inside = kind == BEGIN
+
+        stream = ReplayStream(draws)
+        p = Player(self.player_name, stream)
+        gc = GameController(Dungeon(p, stream, self.rooms, self.links))
+        finished = True
+        for x, recorded in commands[:step]:
+            if recorded is MISSING:
+                # the writer stopped while the command was executed
+                finished = False
+                break
+            result = gc.execute_move(x)
+            if result != recorded:
+                raise ReplayError(f'game {session}: {x} gave {result}, the journal recorded {recorded}')
+            gc.update_game_state(result, x)
+
+        # a game replayed to its end uses every draw it recorded, otherwise it did not play the same game
+        if finished and (step is None or step >= len(commands)) and stream.pos != len(draws):
+            raise ReplayError(f'game {session}: the replay used {stream.pos} of the {len(draws)} recorded draws')
+        return gc
+
+    def replay_all(self):
+        """ Replays every game to its last step, returns the number of records replayed """
+        for session in self.games():
+            self.replay(session)
+        return len(self.records)
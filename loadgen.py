@@ -0,0 +1,125 @@
+""" Load generator for the game server.
+    Opens many concurrent client sessions that each play a full game, and reports the
+    sessions per second and the latency of each command.
+
+    python loadgen.py --port 8765 --sessions 10000 --concurrency 500
+    python loadgen.py --local --sessions 10000      (starts a server in the same process)
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from server import GameServer
+
+
+async def play_session(connect, pick, latencies):
+    """ Plays one game over a new connection, adds the latency of every command to latencies
+        Returns how the game ended (escaped, died or quit)
+    """
+    reader, writer = await connect()
+    try:
+        line = (await reader.readline()).decode().split()
+        while True:
+            # line is the MOVES line, pick one of the options ('move' only announces a list of rooms)
+            options = line[1:]
+            if options[0] == 'move':
+                options = options[1:]
+            command = pick(options)
+            start = time.perf_counter()
+            writer.write((command + '\n').encode())
+            while True:
+                line = (await reader.readline()).decode().split()
+                if not line or line[0] in ('MOVES', 'BYE'):
+                    break
+            latencies.append(time.perf_counter() - start)
+            if not line:
+                return 'closed'
+            if line[0] == 'BYE':
+                return line[1]
+    finally:
+        writer.close()
+
+
+def first_option(options):
+    return options[0]
+
+
+def random_option(options):
+    return random.choice(options)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+async def run_load(connect, sessions, concurrency, pick):
+    """ Plays sessions games, at most concurrency at a time, and returns the measurements """
+    latencies = []
+    outcomes = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            outcome = await play_session(connect, pick, latencies)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'sessions': sessions,
+        'seconds': elapsed,
+        'sessions_per_sec': sessions / elapsed,
+        'commands': len(latencies),
+        'commands_per_sec': len(latencies) / elapsed,
+        'latency_ms': {p: percentile(latencies, p) * 1000 for p in (50, 90, 99, 99.9)},
+        'outcomes': outcomes,
+    }
+
+
+async def main_async(args):
+    server = None
+    if args.local:
+        server = GameServer(args.seed)
+        await server.start(args.host, args.port, args.unix)
+
+    if args.unix:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+
+    pick = random_option if args.policy == 'random' else first_option
+    stats = await run_load(connect, args.sessions, args.concurrency, pick)
+
+    if server is not None:
+        server.server.close()
+        await server.server.wait_closed()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the Dungeon Dave game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='connect to this Unix socket instead of TCP')
+    parser.add_argument('--sessions', type=int, default=1000, help='number of games to play')
+    parser.add_argument('--concurrency', type=int, default=100, help='number of games played at the same time')
+    parser.add_argument('--policy', choices=('first', 'random'), default='random')
+    parser.add_argument('--local', action='store_true', help='start a server in this process')
+    parser.add_argument('--seed', type=int, help='master seed of the local server')
+    args = parser.parse_args()
+
+    stats = asyncio.run(main_async(args))
+    print(f"{stats['sessions']} sessions in {stats['seconds']:.2f}s: "
+          f"{stats['sessions_per_sec']:.0f} sessions/s, {stats['commands_per_sec']:.0f} commands/s")
+    print('latency ms: ' + ', '.join(f'p{p}={v:.2f}' for p, v in stats['latency_ms'].items()))
+    print('outcomes: ' + ', '.join(f'{k}={v}' for k, v in sorted(stats['outcomes'].items())))
+
+
+if __name__ == '__main__':
+    main()
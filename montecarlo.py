@@ -0,0 +1,125 @@
+""" Multi-core Monte Carlo estimation of escape rates for a dungeon layout.
+    Games are split into fixed-size blocks and each block is seeded from the master seed by its
+    block number (SeedSequence spawn keys), so the results only depend on the master seed and
+    the block size, never on the number of worker processes.
+
+    Every block also aggregates the distributions of its games in a stats.GameStats (constant memory),
+    and the blocks' stats are merged in block order.
+
+    python montecarlo.py --games 1000000 --seed 1 --policy random
+    python montecarlo.py --games 1000000 --seed 1 --summary summary.json
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import HeadlessEngine, POLICIES
+from stats import GameStats
+
+# counters returned by every block, all integers so that totals are exact whatever the merge order
+TOTALS = ('games', 'escaped', 'died', 'fights', 'runs', 'moves', 'health', 'agility')
+
+
+def play_block(task):
+    """ Plays one block of games in a worker and returns its compact totals
+        task is (entropy, block number, number of games, policy name, rooms, links)
+    """
+    entropy, block, games, policy, rooms, links = task
+    seed = np.random.SeedSequence(entropy, spawn_key=(block,))
+    engine = HeadlessEngine(POLICIES[policy], seed, rooms=rooms, links=links)
+
+    totals = dict.fromkeys(TOTALS, 0)
+    deaths = {}         # room id -> number of players that died there
+    stats = GameStats()
+    for r in engine.play_many(games):
+        stats.add(r)
+        totals['games'] += 1
+        totals['escaped'] += r.escaped
+        totals['died'] += r.died
+        totals['fights'] += r.fights_count
+        totals['runs'] += r.runs_count
+        totals['moves'] += r.moves
+        totals['health'] += r.health
+        totals['agility'] += r.agility
+        if r.died:
+            deaths[r.final_room] = deaths.get(r.final_room, 0) + 1
+    totals['deaths'] = deaths
+    totals['stats'] = stats
+    return totals
+
+
+def merge(total, part):
+    """ Adds the totals of a block to total """
+    for k in TOTALS:
+        total[k] += part[k]
+    for room, n in part['deaths'].items():
+        total['deaths'][room] = total['deaths'].get(room, 0) + n
+    total['stats'].merge(part['stats'])
+    return total
+
+
+def run(games, seed=None, policy='first', workers=None, block_size=1000, rooms=None, links=None):
+    """ Plays games games over workers processes (all cores by default, 1 plays in this process)
+        Returns the totals of all the games and the derived rates, identical for a given seed,
+        policy and block_size whatever the number of workers
+    """
+    if policy not in POLICIES:
+        raise ValueError(f'unknown policy {policy}, expected one of {tuple(POLICIES)}')
+
+    # the entropy is fixed here so that every worker derives its block seeds from the same one
+    entropy = np.random.SeedSequence(seed).entropy
+    n_blocks = (games + block_size - 1) // block_size
+    tasks = [(entropy, b, min(block_size, games - b * block_size), policy, rooms, links) for b in range(n_blocks)]
+
+    total = dict.fromkeys(TOTALS, 0)
+    total['deaths'] = {}
+    total['stats'] = GameStats()
+    if workers == 1:
+        for part in map(play_block, tasks):
+            merge(total, part)
+    else:
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(workers) as ex:
+            for part in ex.map(play_block, tasks, chunksize=max(1, n_blocks // (4 * workers))):
+                merge(total, part)
+
+    n = max(total['games'], 1)
+    total['seed'] = entropy
+    total['escape_rate'] = total['escaped'] / n
+    total['mean_fights'] = total['fights'] / n
+    total['mean_runs'] = total['runs'] / n
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate escape rates with many simulated games')
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--seed', type=int, help='master seed (random if not given, and printed)')
+    parser.add_argument('--policy', choices=tuple(POLICIES), default='first')
+    parser.add_argument('--workers', type=int, help='number of worker processes (all cores by default)')
+    parser.add_argument('--block-size', type=int, default=1000, help='games per block, part of the seed derivation')
+    parser.add_argument('--summary', help='write the summary of the distributions to this JSON file (- for stdout)')
+    args = parser.parse_args()
+
+    r = run(args.games, args.seed, args.policy, args.workers, args.block_size)
+    print(f"seed {r['seed']}: {r['games']} games, escape rate {r['escape_rate']:.4f}, "
+          f"fights/game {r['mean_fights']:.3f}, runs/game {r['mean_runs']:.3f}")
+    print('deaths by room: ' + ', '.join(f'{k}={v}' for k, v in sorted(r['deaths'].items())))
+    summary = r['stats'].summary()
+    for name, s in summary['fields'].items():
+        print(f"{name:13} mean {s['mean']:.3f} std {s['std']:.3f} p50 {s['p50']:.0f} p90 {s['p90']:.0f} p99 {s['p99']:.0f} "
+              f"max {s['max']:.0f}")
+    if args.summary:
+        text = json.dumps(summary, indent=2)
+        if args.summary == '-':
+            print(text)
+        else:
+            with open(args.summary, 'w') as f:
+                f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+""" Optimal move policy, precomputed by value iteration over the game states.
+    For every room, player health and agility (and monster health and agility when a live monster
+    is in the room) the table holds the move with the highest probability of escaping, so a bot
+    picks its move with one array lookup instead of a search.
+
+    The states and odds are the ones of solver.Solver. The layout is acyclic, so one sweep of the
+    Bellman update from the EXIT backwards (rooms in topological order) already gives the fixed point.
+
+    python optimal.py --out policy.npz      builds the table for the default layout and saves it
+"""
+import argparse
+
+import numpy as np
+
+from solver import CREATURE_ROLLS, TREASURE_ROLLS, MONSTER_ODDS, Layout
+
+# stats are indexed directly, 0..MAX_STAT
+MAX_STAT = 10
+SIZE = MAX_STAT + 1
+
+# values of PolicyTable.fight
+RUN = 0
+FIGHT = 1
+
+# value of PolicyTable.move for rooms without doors
+NO_MOVE = 255
+
+
+class PolicyTable:
+    """ Best move for every state of a layout
+        room_ids    room id of every position
+        offsets     the doors of the room at position i are targets[offsets[i]:offsets[i + 1]] (room ids, link order)
+        move        uint8 [position, health, agility], index of the best door among the room's doors
+        fight       uint8 [position, health, agility, monster health, monster agility], FIGHT or RUN
+        value       float32 [position, health, agility], probability of escaping when entering the room
+    """
+    def __init__(self, room_ids, offsets, targets, move, fight, value):
+        self.room_ids = room_ids
+        self.offsets = offsets
+        self.targets = targets
+        self.move = move
+        self.fight = fight
+        self.value = value
+        self.position = {int(room_id): i for i, room_id in enumerate(room_ids)}
+
+    @classmethod
+    def build(cls, rooms=None, links=None):
+        """ Runs the value iteration for a layout (Dungeon.init_rooms and Dungeon.room_links by default) """
+        layout = Layout(rooms, links)
+        n = len(layout.ids)
+        position = {room_id: i for i, room_id in enumerate(layout.ids)}
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(layout.next_rooms[k]) for k in layout.ids])
+        targets = np.array([t for k in layout.ids for t in layout.next_rooms[k]], dtype=np.int64)
+
+        move = np.full((n, SIZE, SIZE), NO_MOVE, dtype=np.uint8)
+        fight = np.zeros((n, SIZE, SIZE, SIZE, SIZE), dtype=np.uint8)
+        value = np.zeros((n, SIZE, SIZE), dtype=np.float64)
+
+        stat = np.arange(SIZE, dtype=np.float64)
+        # odds of the player over a monster, [player stat, monster stat] (0 when both are 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            odds = np.nan_to_num(stat[:, None] / (stat[:, None] + stat[None, :]))
+
+        for room in layout.order:
+            i = position[room]
+            kind = layout.kind[room]
+            if kind == 'EXIT':
+                value[i, 1:] = 1.0
+                continue
+
+            # nothing left to do but move on: the best door
+            doors = [position[k] for k in layout.next_rooms[room]]
+            cleared = np.zeros((SIZE, SIZE))
+            if doors:
+                door_values = value[doors]
+                move[i] = np.argmax(door_values, axis=0)
+                cleared = door_values.max(axis=0)
+            cleared[0] = 0.0
+
+            if kind != 'MURKY':
+                value[i] = cleared
+                continue
+
+            # facing a live monster, [h, a, mh, ma]; smaller stats are solved first
+            best = np.zeros((SIZE, SIZE, SIZE, SIZE))
+            if doors:
+                # running always takes the first door, hurt with the player's own odds (see BattleManager.run)
+                first = value[doors[0]]
+                hurt = np.zeros((SIZE, SIZE))
+                hurt[3:] = first[1:-2, np.maximum(np.arange(SIZE) - 2, 0)]
+                run_odds = odds[None, :, None, :]          # [., a, ., ma]
+                run = run_odds * hurt[:, :, None, None] + (1 - run_odds) * first[:, :, None, None]
+                run = np.broadcast_to(run, (SIZE, SIZE, SIZE, SIZE))
+            else:
+                run = np.full((SIZE, SIZE, SIZE, SIZE), -1.0)
+
+            for h in range(1, SIZE):
+                for mh in range(1, SIZE):
+                    p = odds[h, mh]
+                    won = best[h, :, mh - 2, :] if mh > 2 else cleared[h][:, None]
+                    lost = best[h - 2, :, mh, :] if h > 2 else 0.0
+                    fought = p * won + (1 - p) * lost
+                    choose_fight = fought >= run[h, :, mh, :]
+                    fight[i, h, :, mh, :] = choose_fight
+                    best[h, :, mh, :] = np.where(choose_fight, fought, run[h, :, mh, :])
+
+            # a monster with any of the rolls, or a treasure with any of the rewards
+            monster = best[:, :, CREATURE_ROLLS.start:CREATURE_ROLLS.stop, CREATURE_ROLLS.start:CREATURE_ROLLS.stop]
+            treasure = np.zeros((SIZE, SIZE))
+            for ar in TREASURE_ROLLS:
+                for hr in TREASURE_ROLLS:
+                    hs = np.minimum(np.arange(SIZE) + hr, MAX_STAT)
+                    ags = np.minimum(np.arange(SIZE) + ar, MAX_STAT)
+                    treasure += cleared[hs][:, ags]
+            treasure /= len(TREASURE_ROLLS) ** 2
+            value[i] = MONSTER_ODDS * monster.mean(axis=(2, 3)) + (1 - MONSTER_ODDS) * treasure
+            value[i, 0] = 0.0
+
+        return cls(np.array(layout.ids, dtype=np.int64), offsets, targets, move, fight, value.astype(np.float32))
+
+    def save(self, path):
+        np.savez_compressed(path, room_ids=self.room_ids, offsets=self.offsets, targets=self.targets,
+                            move=self.move, fight=self.fight, value=self.value)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f['room_ids'], f['offsets'], f['targets'], f['move'], f['fight'], f['value'])
+
+    def escape_rate(self, room_id=None):
+        """ Probability of escaping from room_id (the first room of the layout by default), averaged over the player's rolls """
+        i = 0 if room_id is None else self.position[room_id]
+        rolls = slice(CREATURE_ROLLS.start, CREATURE_ROLLS.stop)
+        return float(self.value[i, rolls, rolls].mean())
+
+    def best_move(self, options, room_id, health, agility, monster_health=None, monster_agility=None):
+        """ Picks one of options (as listed by GameController.next_move_options)
+            Rooms that are not in the table get the first option
+        """
+        i = self.position.get(int(room_id))
+        if i is None:
+            return options[1] if options[0] == 'move' else options[0]
+        health = min(health, MAX_STAT)
+        agility = min(agility, MAX_STAT)
+        if options[0] == 'move':
+            door = self.move[i, health, agility]
+            if door == NO_MOVE:
+                return options[1]
+            return int(self.targets[self.offsets[i] + door])
+        if options[0] == 'fight':
+            if self.fight[i, health, agility, min(monster_health, MAX_STAT), min(monster_agility, MAX_STAT)] == FIGHT:
+                return 'fight'
+            return 'run'
+        return options[0]
+
+    def __call__(self, options, state):
+        """ The table as a solver policy (see solver.Solver) """
+        return self.best_move(options, state.room, state.health, state.agility,
+                              state.monster_health, state.monster_agility)
+
+
+class TablePolicy:
+    """ The table as an engine policy (see engine.HeadlessEngine) """
+    def __init__(self, table):
+        self.table = table if isinstance(table, PolicyTable) else PolicyTable.load(table)
+
+    def __call__(self, options, controller):
+        dg = controller.dungeon
+        room = dg.get_current_room()
+        if room is None:
+            return options[0]
+        monster = room.monster
+        if monster is None:
+            return self.table.best_move(options, room.id, dg.player.health, dg.player.agility)
+        return self.table.best_move(options, room.id, dg.player.health, dg.player.agility,
+                                    monster.health, monster.agility)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the optimal policy table of the default dungeon')
+    parser.add_argument('--out', default='policy.npz', help='where to save the table')
+    args = parser.parse_args()
+
+    table = PolicyTable.build()
+    table.save(args.out)
+    print(f'saved {args.out}: escape rate {table.escape_rate():.4f} with the optimal policy')
+
+
+if __name__ == '__main__':
+    main()
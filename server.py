@@ -0,0 +1,164 @@
+""" asyncio game server: hosts many concurrent games, each with its own Dungeon and Player.
+    Clients connect over TCP or a Unix socket and play with the usual commands
+    (enter, fight, run, reward, room ids, escape, bye), one command per line.
+
+    Protocol (one line per message, utf8):
+        server -> client   MOVES <option> <option> ...    the valid moves, sent after every command
+                           OK <RESULT> <health> <agility> <room>
+                                                          outcome of the command and the player's stats
+                           ERR badIO                      the command was not one of the valid moves
+                           ERR tooLong                    the line was longer than the server's line limit
+                           ERR error                      the command failed on the server, the game goes on
+                           BYE <escaped|died|quit>        the game is over, the server closes the connection
+        client -> server   <command>
+
+    Start a server:  python server.py --port 8765   (or --unix /tmp/dungeon.sock)
+"""
+import argparse
+import asyncio
+import traceback
+
+from dungeon import Dungeon, GameController, Player
+from dungeon.rng import RandomStream
+
+
+class GameSession:
+    """ One game, driven by text commands instead of input() """
+    def __init__(self, rng, player_name='Dangerous Dave'):
+        p = Player(player_name, rng)
+        self.gc = GameController(Dungeon(p, rng))
+        self.options = self.gc.next_move_options()
+        self.finished = False
+
+    def moves_line(self):
+        return 'MOVES ' + ' '.join(str(o) for o in self.options)
+
+    def handle(self, command):
+        """ Plays one command and returns the lines to send back """
+        x = GameController.check_move(self.options, command)
+        if x == 'bye':
+            self.finished = True
+            return ['BYE quit']
+        if x == 'badIO':
+            return ['ERR badIO', self.moves_line()]
+
+        gc = self.gc
+        result = gc.execute_move(x)
+        gc.update_game_state(result, x)
+
+        p = gc.dungeon.player
+        lines = [f'OK {GameController.RESULT_NAMES.get(result, "NONE")} {p.health} {p.agility} {gc.dungeon.player_location}']
+        if gc.is_game_running() == False:
+            self.finished = True
+            lines.append('BYE died')
+        elif gc.user_escaped(x) == True:
+            self.finished = True
+            lines.append('BYE escaped')
+        else:
+            self.options = gc.next_move_options()
+            lines.append(self.moves_line())
+        return lines
+
+
+class GameServer:
+    """ Serves one GameSession per connection
+        Every session draws from its own stream spawned from the server's seed
+    """
+    # returned by _read_line for a line longer than the reader's limit
+    TOO_LONG = b'too long'
+
+    def __init__(self, seed=None):
+        self.rng = RandomStream(seed, block=64)
+        self.sessions_started = 0
+        self.sessions_active = 0
+        self.commands = 0
+        self.errors = 0                 # commands that raised, answered with ERR error
+        self.server = None
+
+    async def handle_client(self, reader, writer):
+        session = GameSession(self.rng.spawn()[0])
+        self.sessions_started += 1
+        self.sessions_active += 1
+        try:
+            writer.write((session.moves_line() + '\n').encode())
+            while not session.finished:
+                line = await self._read_line(reader)
+                if line is None:
+                    break
+                if line is GameServer.TOO_LONG:
+                    lines = ['ERR tooLong', session.moves_line()]
+                else:
+                    self.commands += 1
+                    lines = self._handle(session, line)
+                writer.write(('\n'.join(lines) + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions_active -= 1
+            writer.close()
+
+    def _handle(self, session, line):
+        """ Plays one line of a session; a command that raises is answered with ERR error, the session goes on """
+        try:
+            # bytes that are not utf8 make an invalid command, answered like any other one
+            return session.handle(line.decode(errors='replace').strip())
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+            return ['ERR error', session.moves_line()]
+
+    @staticmethod
+    async def _read_line(reader):
+        """ Returns the next line of the client, None once the connection is closed, or TOO_LONG for a line
+            longer than the reader's limit (which is dropped up to its newline)
+        """
+        try:
+            return await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            # the connection closed, maybe after a last line without its newline
+            return e.partial or None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        while True:
+            # drop what the reader holds of the line, until its newline comes in
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b'\n')
+                return GameServer.TOO_LONG
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+            except asyncio.IncompleteReadError:
+                return None
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        """ Starts listening on a Unix socket if path is given, on host:port otherwise """
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=path, backlog=4096)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port, backlog=4096)
+        return self.server
+
+    async def serve_forever(self, host='127.0.0.1', port=8765, path=None):
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dungeon Dave game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--seed', type=int, help='master seed of the game sessions')
+    args = parser.parse_args()
+
+    server = GameServer(args.seed)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+""" Binary snapshots of running games.
+    Many sessions that play the same layout are saved into one file of fixed-size records, and the
+    file is opened through a memory map, so opening a snapshot of any size costs the same and a
+    session is only rebuilt when it is restored.
+
+    File layout (little endian):
+        header      magic, version, number of sessions, number of rooms, offset of the records,
+                    size of the layout (see HEADER)
+        layout      utf8 JSON: the rooms {id: type or (type, monster name)}, the links and the player name
+        records     one SESSION record per session (see session_dtype), starting on a 64 byte boundary
+
+    The random streams of the games are not saved: a restored game draws from the stream it is given.
+"""
+import json
+import struct
+from array import array
+
+import numpy as np
+
+from dungeon import Dungeon, GameController, Player
+from dungeon.store import EntityStore, ROOM_TYPE_CODES
+
+MAGIC = b'DDAVESNP'
+VERSION = 1
+
+# magic, version, number of sessions, number of rooms, offset of the records, size of the layout
+HEADER = struct.Struct('<8sIQQQQ')
+
+# alignment of the records
+ALIGNMENT = 64
+
+# state of one room
+ROOM_DTYPE = np.dtype([
+    ('monster_room', '<i8'),        # room of the monster (Monster.current_room)
+    ('room_type', 'i1'),            # code in store.ROOM_TYPES
+    ('has_monster', 'i1'),
+    ('has_treasure', 'i1'),
+    ('monster', 'i1'),              # 1 if the room holds a Monster (alive or not)
+    ('monster_alive', 'i1'),
+    ('monster_agility', 'i1'),
+    ('monster_health', 'i1'),
+    ('treasure', 'i1'),             # 1 if the room holds a Treasure (empty or not)
+    ('agility_reward', 'i1'),
+    ('health_reward', 'i1'),
+    ('treasure_empty', 'i1'),
+    ('pad', 'V5'),
+])
+
+
+# the same fields as plain structs, to read a record without going through numpy
+ROOM_STRUCT = struct.Struct('<q11b5x')
+PLAYER_STRUCT = struct.Struct('<qiibbb5x')
+
+
+def session_dtype(n_rooms):
+    """ Record of one session: the player and the state of the n_rooms rooms, in layout order """
+    return np.dtype([
+        ('player_location', '<i8'),
+        ('fights_count', '<i4'),
+        ('runs_count', '<i4'),
+        ('health', 'i1'),
+        ('agility', 'i1'),
+        ('is_alive', 'i1'),
+        ('pad', 'V5'),
+        ('rooms', ROOM_DTYPE, (n_rooms,)),
+    ])
+
+
+def encode_layout(rooms, links, player_name):
+    """ The layout of a game as utf8 JSON (also used by the journal) """
+    return json.dumps({
+        'rooms': [[k, v] if isinstance(v, str) else [k, list(v)] for k, v in rooms.items()],
+        'links': [list(link) for link in links],
+        'player_name': player_name,
+    }).encode()
+
+
+def decode_layout(data):
+    """ Returns the rooms, links and player name saved by encode_layout """
+    layout = json.loads(data.decode())
+    rooms = {k: v if isinstance(v, str) else tuple(v) for k, v in layout['rooms']}
+    links = tuple(tuple(link) for link in layout['links'])
+    return rooms, links, layout['player_name']
+
+
+def _room_record(room):
+    monster = room.monster
+    treasure = room.treasure
+    return (
+        monster.current_room if monster is not None else room.id,
+        ROOM_TYPE_CODES[room.room_type],
+        room.has_monster,
+        room.has_treasure,
+        monster is not None,
+        monster is not None and monster.is_alive,
+        monster.agility if monster is not None else 0,
+        monster.health if monster is not None else 0,
+        treasure is not None,
+        treasure.agility_reward if treasure is not None else 0,
+        treasure.health_reward if treasure is not None else 0,
+        treasure is not None and treasure.empty,
+        b'',
+    )
+
+
+def pack(controllers, n_rooms):
+    """ Returns the records of the games of controllers as one array """
+    records = []
+    for gc in controllers:
+        dg = gc.dungeon
+        if len(dg.rooms) != n_rooms:
+            raise ValueError(f'expected a dungeon with {n_rooms} rooms, got {len(dg.rooms)}')
+        p = dg.player
+        records.append((dg.player_location, p.fights_count, p.runs_count, p.health, p.agility, p.is_alive, b'',
+                        [_room_record(room) for room in dg.rooms]))
+    return np.array(records, dtype=session_dtype(n_rooms))
+
+
+def save(path, controllers, rooms=None, links=None, player_name='Dangerous Dave'):
+    """ Saves the games of controllers, which all play the layout rooms and links
+        (Dungeon.init_rooms and Dungeon.room_links by default)
+    """
+    rooms = Dungeon.init_rooms if rooms is None else rooms
+    links = Dungeon.room_links if links is None else links
+    layout = encode_layout(rooms, links, player_name)
+
+    records = pack(controllers, len(rooms))
+    offset = -(-(HEADER.size + len(layout)) // ALIGNMENT) * ALIGNMENT
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records), len(rooms), offset, len(layout)))
+        f.write(layout)
+        f.write(bytes(offset - HEADER.size - len(layout)))
+        records.tofile(f)
+
+
+class Snapshot:
+    """ A snapshot file opened through a memory map (read only by default, mode='r+' to update sessions)
+        records is the array of SESSION records, nothing is copied until a session is restored
+    """
+    def __init__(self, path, mode='r'):
+        with open(path, 'rb') as f:
+            magic, version, n_sessions, n_rooms, offset, layout_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a snapshot')
+            if version != VERSION:
+                raise ValueError(f'{path} is a version {version} snapshot, expected version {VERSION}')
+            self.rooms, self.links, self.player_name = decode_layout(f.read(layout_size))
+
+        self.ids = list(self.rooms.keys())
+        self.names = [None if isinstance(v, str) else v[1] for v in self.rooms.values()]
+        if n_sessions:
+            self.records = np.memmap(path, dtype=session_dtype(n_rooms), mode=mode, offset=offset, shape=(n_sessions,))
+        else:
+            self.records = np.zeros(0, dtype=session_dtype(n_rooms))
+
+    def __len__(self):
+        return len(self.records)
+
+    def restore(self, i, rng=None):
+        """ Rebuilds session i as a GameController; its dungeon keeps the rooms in an EntityStore """
+        raw = self.records[i:i + 1].tobytes()
+        location, fights_count, runs_count, health, agility, is_alive = PLAYER_STRUCT.unpack_from(raw)
+        p = Player(self.player_name, rng, agility=agility, health=health)
+        p.is_alive = is_alive == 1
+        p.fights_count = fights_count
+        p.runs_count = runs_count
+
+        # one tuple of values per field, in the order of ROOM_DTYPE
+        (monster_room, room_type, has_monster, has_treasure, monster, monster_alive, monster_agility,
+         monster_health, treasure, agility_reward, health_reward, treasure_empty) = zip(
+            *ROOM_STRUCT.iter_unpack(raw[PLAYER_STRUCT.size:]))
+
+        store = EntityStore(self.ids)
+        store.room_type = array('b', room_type)
+        store.has_monster = array('b', has_monster)
+        store.has_treasure = array('b', has_treasure)
+        store.monster_agility = array('b', monster_agility)
+        store.monster_health = array('b', monster_health)
+        store.monster_alive = array('b', monster_alive)
+        store.monster_room = array('q', monster_room)
+        store.has_treasure_slot = array('b', treasure)
+        store.agility_reward = array('b', agility_reward)
+        store.health_reward = array('b', health_reward)
+        store.treasure_empty = array('b', treasure_empty)
+        for j, has in enumerate(monster):
+            if has:
+                store.monster_name[j] = self.names[j]
+
+        dg = Dungeon(p, rng, links=self.links, store=store)
+        dg.player_location = location
+        return GameController(dg)
+
+    def update(self, i, gc):
+        """ Overwrites session i with the game of gc (the snapshot must be opened with mode='r+') """
+        self.records[i] = pack([gc], len(self.ids))[0]
+
+    def flush(self):
+        if isinstance(self.records, np.memmap):
+            self.records.flush()
+
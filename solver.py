@@ -0,0 +1,265 @@
+""" Exact evaluation of the game as a Markov chain.
+    For a dungeon layout and a move policy, computes the probability of escaping through the EXIT
+    and the expected number of fights and runs, with a memoized recursion over the game states
+    instead of sampling games.
+
+    The odds are the ones of BattleManager.fight and BattleManager.run, the rolls the ones of
+    Room.__init__ (75% monster), Creature.__init__ (2..10) and Treasure.__init__ (2..8).
+    The layout must be acyclic (like Dungeon.room_links): every room is then entered at most once,
+    so the contents of a room are unknown until the player enters it.
+"""
+from collections import namedtuple
+
+from dungeon import Dungeon
+
+# state of the player in a room; monster_health / monster_agility are None when there is no live monster
+State = namedtuple('State', ['room', 'health', 'agility', 'monster_health', 'monster_agility'])
+
+# (probability of escaping, expected number of fights, expected number of runs)
+Value = namedtuple('Value', ['escape', 'fights', 'runs'])
+
+DEAD = Value(0.0, 0.0, 0.0)
+
+# possible rolls
+CREATURE_ROLLS = range(2, 11)
+TREASURE_ROLLS = range(2, 9)
+MONSTER_ODDS = 0.75
+
+# options in a room with a live monster
+FIGHT_OPTIONS = ['fight', 'run']
+
+
+def first_option_policy(options, state):
+    """ Fights every monster and takes the first door (like engine.first_option_policy) """
+    if options[0] == 'move':
+        return options[1]
+    return options[0]
+
+
+def run_policy(options, state):
+    """ Runs from every monster and takes the first door (like engine.run_policy) """
+    if 'run' in options:
+        return 'run'
+    return first_option_policy(options, state)
+
+
+def random_policy(options, state):
+    """ Picks any valid option with equal odds (like engine.random_policy) """
+    if options[0] == 'move':
+        options = options[1:]
+    return {o: 1 / len(options) for o in options}
+
+
+# policies by name, same names as engine.POLICIES
+POLICIES = {'first': first_option_policy, 'run': run_policy, 'random': random_policy}
+
+
+class Layout:
+    """ A dungeon layout (same format as Dungeon.init_rooms and Dungeon.room_links) prepared for solvers:
+        the type of every room, its connections in link order, and the rooms in topological order
+    """
+    def __init__(self, rooms=None, links=None):
+        rooms = Dungeon.init_rooms if rooms is None else rooms
+        links = Dungeon.room_links if links is None else links
+
+        self.ids = list(rooms.keys())
+        self.kind = {}
+        for k, v in rooms.items():
+            self.kind[k] = v if isinstance(v, str) else v[0]
+        self.entry = next(k for k in self.ids if self.kind[k] == 'ENTRY')
+
+        self.next_rooms = {k: [] for k in self.ids}
+        for src, dst in links:
+            if src in self.next_rooms and dst in self.next_rooms and src != dst:
+                self.next_rooms[src].append(dst)
+
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        """ Returns the room ids so that every room comes after the rooms it links to
+            Raises ValueError if the layout has a cycle
+        """
+        order = []
+        state = {}          # room id -> 1 while being visited, 2 when done
+        for start in self.ids:
+            if start in state:
+                continue
+            stack = [(start, iter(self.next_rooms[start]))]
+            state[start] = 1
+            while stack:
+                room, children = stack[-1]
+                for child in children:
+                    if state.get(child) == 1:
+                        raise ValueError(f'the layout has a cycle through room {child}')
+                    if child not in state:
+                        state[child] = 1
+                        stack.append((child, iter(self.next_rooms[child])))
+                        break
+                else:
+                    stack.pop()
+                    state[room] = 2
+                    order.append(room)
+        return order
+
+
+class Solver:
+    """ Evaluates a policy exactly
+        A policy is a callable policy(options, state) where options is the list returned by
+        GameController.next_move_options and state a State. It returns either one of the options
+        or a dict {option: probability}. It must always give the same answer for the same arguments.
+    """
+    def __init__(self, policy=first_option_policy, rooms=None, links=None):
+        self.policy = POLICIES[policy] if isinstance(policy, str) else policy
+        self.layout = Layout(rooms, links)
+        self._arrive = {}       # (room, health, agility) -> Value when entering a room
+        self._cleared = {}      # (room, health, agility) -> Value in a room without monster or treasure
+        self._fight = {}        # (room, health, agility, monster health, monster agility) -> Value
+
+        # warm the memo from the EXIT backwards, so the recursion never goes deeper than one room
+        for room in self.layout.order:
+            for h in range(1, 11):
+                for a in range(0, 11):
+                    self.arrive(room, h, a)
+
+    def _choose(self, options, state):
+        """ Returns the policy's choice as a dict {option: probability} """
+        choice = self.policy(options, state)
+        if isinstance(choice, dict):
+            return choice
+        return {choice: 1.0}
+
+    def arrive(self, room, health, agility):
+        """ Value of entering room with the given stats (its contents are not rolled yet) """
+        key = (room, health, agility)
+        value = self._arrive.get(key)
+        if value is not None:
+            return value
+
+        kind = self.layout.kind[room]
+        if kind == 'EXIT':
+            value = Value(1.0, 0.0, 0.0)
+        elif kind == 'MURKY':
+            # a monster with any of the rolls, or a treasure with any of the rewards
+            e = f = r = 0.0
+            for ma in CREATURE_ROLLS:
+                for mh in CREATURE_ROLLS:
+                    v = self.fight(room, health, agility, mh, ma)
+                    e += v[0]
+                    f += v[1]
+                    r += v[2]
+            p = MONSTER_ODDS / (len(CREATURE_ROLLS) ** 2)
+            value = Value(e * p, f * p, r * p)
+
+            e = f = r = 0.0
+            for ar in TREASURE_ROLLS:
+                for hr in TREASURE_ROLLS:
+                    v = self.cleared(room, min(health + hr, 10), min(agility + ar, 10))
+                    e += v[0]
+                    f += v[1]
+                    r += v[2]
+            value = _add(value, Value(e, f, r), (1 - MONSTER_ODDS) / (len(TREASURE_ROLLS) ** 2))
+        else:
+            value = self.cleared(room, health, agility)
+
+        self._arrive[key] = value
+        return value
+
+    def cleared(self, room, health, agility):
+        """ Value of being in a room where there is nothing left to do but move on """
+        key = (room, health, agility)
+        value = self._cleared.get(key)
+        if value is not None:
+            return value
+
+        next_rooms = self.layout.next_rooms[room]
+        value = DEAD        # a dead end: the player never escapes
+        if next_rooms:
+            options = ['move'] + next_rooms
+            for choice, p in self._choose(options, State(room, health, agility, None, None)).items():
+                value = _add(value, self.arrive(int(choice), health, agility), p)
+
+        self._cleared[key] = value
+        return value
+
+    def fight(self, room, health, agility, monster_health, monster_agility):
+        """ Value of facing a live monster """
+        key = (room, health, agility, monster_health, monster_agility)
+        value = self._fight.get(key)
+        if value is not None:
+            return value
+
+        state = State(room, health, agility, monster_health, monster_agility)
+        choice = self._choose(FIGHT_OPTIONS, state)
+        if len(choice) == 1:
+            # the usual case, a deterministic choice
+            if 'fight' in choice:
+                value = self._fight_once(*key)
+            else:
+                value = self._run_once(*key)
+        else:
+            value = DEAD
+            for option, p in choice.items():
+                if option == 'fight':
+                    outcome = self._fight_once(*key)
+                else:
+                    outcome = self._run_once(*key)
+                value = _add(value, outcome, p)
+
+        self._fight[key] = value
+        return value
+
+    def _fight_once(self, room, health, agility, monster_health, monster_agility):
+        """ BattleManager.fight: the loser loses 2 health, 2 or less is fatal """
+        p = health / (health + monster_health)
+        if monster_health > 2:
+            won = self.fight(room, health, agility, monster_health - 2, monster_agility)
+        else:
+            won = self.cleared(room, health, agility)
+        if health > 2:
+            lost = self.fight(room, health - 2, agility, monster_health, monster_agility)
+        else:
+            lost = DEAD
+        return Value(p * won[0] + (1 - p) * lost[0],
+                     p * won[1] + (1 - p) * lost[1] + 1,
+                     p * won[2] + (1 - p) * lost[2])
+
+    def _run_once(self, room, health, agility, monster_health, monster_agility):
+        """ BattleManager.run, then the move to the first connected room
+            (as in BattleManager.run, the player is hurt with the player's own odds)
+        """
+        next_rooms = self.layout.next_rooms[room]
+        p = agility / (agility + monster_agility)
+        if not next_rooms:
+            # a dead end: nowhere to run to, the player never escapes
+            unhurt = hurt = DEAD
+        else:
+            unhurt = self.arrive(next_rooms[0], health, agility)
+            if health - 2 > 0:
+                hurt = self.arrive(next_rooms[0], health - 2, max(agility - 2, 0))
+            else:
+                hurt = DEAD
+        return Value(p * hurt[0] + (1 - p) * unhurt[0],
+                     p * hurt[1] + (1 - p) * unhurt[1],
+                     p * hurt[2] + (1 - p) * unhurt[2] + 1)
+
+    def start(self, health, agility):
+        """ Value of a new game for a player born with the given stats """
+        return self.arrive(self.layout.entry, health, agility)
+
+    def solve(self):
+        """ Value of a new game averaged over every starting roll of the player,
+            and the value of each roll as a dict {(health, agility): Value}
+        """
+        per_roll = {}
+        value = DEAD
+        p = 1 / (len(CREATURE_ROLLS) ** 2)
+        for a in CREATURE_ROLLS:
+            for h in CREATURE_ROLLS:
+                per_roll[(h, a)] = self.start(h, a)
+                value = _add(value, per_roll[(h, a)], p)
+        return value, per_roll
+
+
+def _add(value, other, p):
+    """ value + p * other """
+    return Value(value.escape + p * other.escape, value.fights + p * other.fights, value.runs + p * other.runs)
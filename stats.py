@@ -0,0 +1,320 @@
+""" Streaming statistics of simulated games, in constant memory.
+    Every statistic keeps a fixed amount of state whatever the number of values it has seen, and two
+    statistics of the same kind can be merged, so workers aggregate their own games and the parent
+    merges their states:
+
+        Moments         count, mean, variance (Welford's online algorithm, Chan's formula to merge), min, max
+        Histogram       counts of fixed-width bins between low and high, plus underflow and overflow
+        QuantileSketch  approximate quantiles with a relative error of at most alpha (a DDSketch:
+                        logarithmic buckets, the lowest ones are collapsed past max_buckets)
+
+    GameStats aggregates the GameResults of the engine (add, one game at a time) or the result arrays
+    of the BatchSimulator (add_batch), and summary() gives the compact summary.
+"""
+import math
+
+import numpy as np
+
+
+class Moments:
+    """ Count, mean, variance, min and max of a stream of numbers """
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0           # sum of the squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def add_batch(self, values):
+        """ Adds an array of values at once """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        batch = Moments()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        self.merge(batch)
+
+    def merge(self, other):
+        """ Adds the values seen by other """
+        if other.count == 0:
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """ Sample variance (0 for less than two values) """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'std': self.std,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+
+class Histogram:
+    """ Counts of bins equal-width bins from low to high; values below low and from high on are
+        counted in underflow and overflow
+    """
+    __slots__ = ('low', 'high', 'bins', 'counts', 'underflow', 'overflow')
+
+    def __init__(self, low, high, bins=None):
+        self.low = low
+        self.high = high
+        self.bins = bins if bins is not None else int(high - low)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, x):
+        if x < self.low:
+            self.underflow += 1
+        elif x >= self.high:
+            self.overflow += 1
+        else:
+            self.counts[int((x - self.low) * self.bins / (self.high - self.low))] += 1
+
+    def add_batch(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        below = values < self.low
+        above = values >= self.high
+        self.underflow += int(below.sum())
+        self.overflow += int(above.sum())
+        inside = values[~(below | above)]
+        bins = ((inside - self.low) * self.bins / (self.high - self.low)).astype(np.int64)
+        self.counts += np.bincount(bins, minlength=self.bins)
+
+    def merge(self, other):
+        if (other.low, other.high, other.bins) != (self.low, self.high, self.bins):
+            raise ValueError(f'cannot merge a histogram of [{other.low}, {other.high}) in {other.bins} bins '
+                             f'into one of [{self.low}, {self.high}) in {self.bins} bins')
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    @property
+    def edges(self):
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def to_dict(self):
+        """ The non-empty bins as {lower edge: count}, with the underflow and overflow """
+        edges = self.edges
+        bins = {(int(edges[i]) if float(edges[i]).is_integer() else float(edges[i])): int(c)
+                for i, c in enumerate(self.counts) if c}
+        return {'bins': bins, 'underflow': self.underflow, 'overflow': self.overflow}
+
+
+class QuantileSketch:
+    """ Approximate quantiles of a stream of non-negative numbers
+        Values are counted in logarithmic buckets (bucket k holds the values in (gamma^(k-1), gamma^k]),
+        so every quantile is within a relative error alpha of the true one; values not above min_value
+        are counted as zeros. Past max_buckets buckets the lowest ones are merged, which only loses
+        accuracy on the lowest quantiles. Sketches with the same alpha merge exactly.
+    """
+    __slots__ = ('alpha', 'gamma', 'log_gamma', 'min_value', 'max_buckets', 'buckets', 'zeros', 'count')
+
+    def __init__(self, alpha=0.01, max_buckets=2048, min_value=1e-9):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_buckets = max_buckets
+        self.buckets = {}           # bucket index -> count
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, x):
+        if x < 0:
+            raise ValueError(f'QuantileSketch only takes non-negative values, got {x}')
+        self.count += 1
+        if x <= self.min_value:
+            self.zeros += 1
+            return
+        k = math.ceil(math.log(x) / self.log_gamma)
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def add_batch(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) and values.min() < 0:
+            raise ValueError('QuantileSketch only takes non-negative values')
+        positive = values[values > self.min_value]
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        keys, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        buckets = self.buckets
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            buckets[k] = buckets.get(k, 0) + c
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        """ Merges the lowest buckets into one until there are max_buckets """
+        keys = sorted(self.buckets)
+        extra = len(keys) - self.max_buckets
+        target = keys[extra]
+        for k in keys[:extra]:
+            self.buckets[target] += self.buckets.pop(k)
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f'cannot merge a sketch of alpha {other.alpha} into one of alpha {self.alpha}')
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    def quantile(self, q):
+        """ The q quantile (0 <= q <= 1), None if no value was added """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if rank < seen:
+                # the middle of the bucket, in relative terms
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class FieldStats:
+    """ Moments, histogram and quantile sketch of one field of the game results """
+    __slots__ = ('moments', 'histogram', 'sketch')
+
+    def __init__(self, low, high, alpha=0.01):
+        self.moments = Moments()
+        self.histogram = Histogram(low, high)
+        self.sketch = QuantileSketch(alpha)
+
+    def add_batch(self, values):
+        self.moments.add_batch(values)
+        self.histogram.add_batch(values)
+        self.sketch.add_batch(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        s = self.moments.to_dict()
+        for q in quantiles:
+            s[f'p{q * 100:g}'] = self.sketch.quantile(q)
+        s['histogram'] = self.histogram.to_dict()
+        return s
+
+
+class GameStats:
+    """ Streaming statistics of finished games: escape and death counts, deaths by room, and the
+        distributions of FIELDS (with one bin per integer value between their bounds)
+        add() buffers up to buffer_size games and adds them as one batch, so the state stays the same
+        size however many games are added
+    """
+    # field of the game results -> histogram bounds [low, high)
+    FIELDS = {'fights_count': (0, 64), 'runs_count': (0, 64), 'health': (0, 11), 'agility': (0, 11),
+              'moves': (0, 256)}
+
+    def __init__(self, alpha=0.01, buffer_size=4096):
+        self.games = 0
+        self.escaped = 0
+        self.died = 0
+        self.deaths = {}            # room id -> number of players that died there
+        self.fields = {name: FieldStats(low, high, alpha) for name, (low, high) in GameStats.FIELDS.items()}
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def add(self, result):
+        """ Adds one engine.GameResult """
+        self._buffer.append(result)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """ Adds the buffered games """
+        if not self._buffer:
+            return
+        columns = list(zip(*self._buffer))
+        fields = self._buffer[0]._fields
+        self._buffer = []
+        self.add_batch({name: np.array(column) for name, column in zip(fields, columns)})
+
+    def add_batch(self, results):
+        """ Adds games given as arrays of their fields: escaped, died, final_room and FIELDS
+            (e.g. BatchSimulator.results())
+        """
+        escaped = np.asarray(results['escaped'], dtype=bool)
+        died = np.asarray(results['died'], dtype=bool)
+        self.games += len(escaped)
+        self.escaped += int(escaped.sum())
+        self.died += int(died.sum())
+        rooms, counts = np.unique(np.asarray(results['final_room'])[died], return_counts=True)
+        for room, n in zip(rooms.tolist(), counts.tolist()):
+            self.deaths[room] = self.deaths.get(room, 0) + n
+        for name, stats in self.fields.items():
+            stats.add_batch(results[name])
+
+    def merge(self, other):
+        """ Adds the games of other (e.g. the stats of another worker) """
+        self.flush()
+        other.flush()
+        self.games += other.games
+        self.escaped += other.escaped
+        self.died += other.died
+        for room, n in other.deaths.items():
+            self.deaths[room] = self.deaths.get(room, 0) + n
+        for name, stats in self.fields.items():
+            stats.merge(other.fields[name])
+        return self
+
+    def __getstate__(self):
+        # buffered games are added before the stats are sent to another process
+        self.flush()
+        return self.__dict__
+
+    def summary(self):
+        """ Compact summary of all the games added, as a dict ready for JSON """
+        self.flush()
+        n = max(self.games, 1)
+        return {
+            'games': self.games,
+            'escaped': self.escaped,
+            'died': self.died,
+            'escape_rate': self.escaped / n,
+            'death_rate': self.died / n,
+            'deaths_by_room': {room: self.deaths[room] for room in sorted(self.deaths)},
+            'fields': {name: stats.summary() for name, stats in self.fields.items()},
+        }